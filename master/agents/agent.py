@@ -1,14 +1,23 @@
 import os
 import logging
 import json
+import re
 import yaml
-import uuid
 import threading
 from collections import defaultdict
 from typing import Dict, Tuple
 from agents.planner import GlobalTaskPlanner
 from flag_scale.flagscale.agent.communication import Communicator
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches a fenced ```json ... ``` block in one compiled-regex pass instead
+# of two str.find traversals over the model output.
+_JSON_BLOCK_RE = re.compile(r"```json\s*(.*?)```", re.DOTALL)
+
 
 class GlobalAgent:
     def __init__(self, config_path="config.yaml"):
@@ -125,17 +134,17 @@ class GlobalAgent:
 
     def _extract_json(self, input_string):
         """Extract JSON from a string."""
-        start_marker = "```json"
-        end_marker = "```"
+        match = _JSON_BLOCK_RE.search(input_string)
+        if match is None:
+            self.logger.warning("[WARNING] JSON markers not found in the string.")
+            return None
+        json_str = match.group(1).strip()
         try:
-            start_idx = input_string.find(start_marker)
-            end_idx = input_string.find(end_marker, start_idx + len(start_marker))
-            if start_idx == -1 or end_idx == -1:
-                self.logger.warning("[WARNING] JSON markers not found in the string.")
-                return None
-            json_str = input_string[start_idx + len(start_marker) : end_idx].strip()
-            json_data = json.loads(json_str)
-            return json_data
+            # orjson's C parser raises a json.JSONDecodeError subclass, so
+            # both branches fall through to the same handler.
+            if orjson is not None:
+                return orjson.loads(json_str)
+            return json.loads(json_str)
         except json.JSONDecodeError as e:
             self.logger.warning(
                 f"[WARNING] JSON cannot be extracted from the string.\n{e}"
@@ -194,7 +203,8 @@ class GlobalAgent:
         self.logger.info(f"Received reasoning and subtasks:\n{reasoning_and_subtasks}")
         subtask_list = reasoning_and_subtasks.get("subtask_list", [])
         grouped_tasks = self._group_tasks_by_order(subtask_list)
-        task_id = str(uuid.uuid4()).replace("-", "")
+        # Same 32-char opaque hex id as uuid4, without the UUID object overhead
+        task_id = os.urandom(16).hex()
         order_flag = "false" if len(grouped_tasks.keys()) == 1 else "true"
         for task_count, (order, group_task) in enumerate(grouped_tasks.items()):
             self.logger.info(f"Sending task group {order}:\n{group_task}")
@@ -36,6 +36,13 @@ class GlobalTaskPlanner:
         self.global_model, self.model_name = self._gat_model_info_from_config(
             config["model"]
         )
+        # Constant sampling parameters, built once instead of per forward() call
+        self._completion_kwargs = {
+            "model": self.model_name,
+            "temperature": 0.0,
+            "top_p": 1.0,
+            "max_tokens": 8192,
+        }
 
     def _get_prompt_from_memory(self, task: str, global_memory: Dict = None) -> str:
         """Get the prompt from memory."""
@@ -110,11 +117,7 @@ class GlobalTaskPlanner:
             },
         ]
         response = self.global_model.chat.completions.create(
-            model=self.model_name,
-            messages=messages,
-            temperature=0.0,
-            top_p=1.0,
-            max_tokens=8192,
+            messages=messages, **self._completion_kwargs
         )
         return response.choices[0].message.content
 
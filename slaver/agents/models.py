@@ -1,1180 +1,2013 @@
-###############################################################
-# Copyright 2025 BAAI. All rights reserved.
-###############################################################
-# Copyright 2024 The HuggingFace Inc. team. All rights reserved.
-#
-# Licensed under the Apache License, Version 2.0 (the "License");
-# you may not use this file except in compliance with the License.
-# You may obtain a copy of the License at
-#
-#     http://www.apache.org/licenses/LICENSE-2.0
-#
-# Unless required by applicable law or agreed to in writing, software
-# distributed under the License is distributed on an "AS IS" BASIS,
-# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-# See the License for the specific language governing permissions and
-# limitations under the License.
-import importlib.util
-import json
-import logging
-import os
-import uuid
-import warnings
-from copy import deepcopy
-from dataclasses import asdict, dataclass
-from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
-
-from huggingface_hub.utils import is_torch_available
-from tools.tools import Tool
-from tools.utils import (
-    _is_package_available,
-    encode_image_base64,
-    make_image_url,
-    parse_json_blob,
-)
-
-if TYPE_CHECKING:
-    from transformers import StoppingCriteriaList
-
-logger = logging.getLogger(__name__)
-
-DEFAULT_JSONAGENT_REGEX_GRAMMAR = {
-    "type": "regex",
-    "value": 'Thought: .+?\\nAction:\\n\\{\\n\\s{4}"action":\\s"[^"\\n]+",\\n\\s{4}"action_input":\\s"[^"\\n]+"\\n\\}\\n<end_code>',
-}
-
-DEFAULT_CODEAGENT_REGEX_GRAMMAR = {
-    "type": "regex",
-    "value": "Thought: .+?\\nCode:\\n```(?:py|python)?\\n(?:.|\\s)+?\\n```<end_code>",
-}
-
-
-def get_dict_from_nested_dataclasses(obj, ignore_key=None):
-    def convert(obj):
-        if hasattr(obj, "__dataclass_fields__"):
-            return {k: convert(v) for k, v in asdict(obj).items() if k != ignore_key}
-        return obj
-
-    return convert(obj)
-
-
-@dataclass
-class ChatMessageToolCallDefinition:
-    arguments: Any
-    name: str
-    description: Optional[str] = None
-
-    @classmethod
-    def from_hf_api(cls, tool_call_definition) -> "ChatMessageToolCallDefinition":
-        return cls(
-            arguments=tool_call_definition.arguments,
-            name=tool_call_definition.name,
-            description=tool_call_definition.description,
-        )
-
-
-@dataclass
-class ChatMessageToolCall:
-    function: ChatMessageToolCallDefinition
-    id: str
-    type: str
-
-    @classmethod
-    def from_hf_api(cls, tool_call) -> "ChatMessageToolCall":
-        return cls(
-            function=ChatMessageToolCallDefinition.from_hf_api(tool_call.function),
-            id=tool_call.id,
-            type=tool_call.type,
-        )
-
-
-@dataclass
-class ChatMessage:
-    role: str
-    content: Optional[str] = None
-    tool_calls: Optional[List[ChatMessageToolCall]] = None
-    raw: Optional[Any] = None  # Stores the raw output from the API
-
-    def model_dump_json(self):
-        return json.dumps(get_dict_from_nested_dataclasses(self, ignore_key="raw"))
-
-    @classmethod
-    def from_hf_api(cls, message, raw) -> "ChatMessage":
-        tool_calls = None
-        if getattr(message, "tool_calls", None) is not None:
-            tool_calls = [
-                ChatMessageToolCall.from_hf_api(tool_call)
-                for tool_call in message.tool_calls
-            ]
-        return cls(
-            role=message.role, content=message.content, tool_calls=tool_calls, raw=raw
-        )
-
-    @classmethod
-    def from_dict(cls, data: dict) -> "ChatMessage":
-        if data.get("tool_calls"):
-            tool_calls = [
-                ChatMessageToolCall(
-                    function=ChatMessageToolCallDefinition(**tc["function"]),
-                    id=tc["id"],
-                    type=tc["type"],
-                )
-                for tc in data["tool_calls"]
-            ]
-            data["tool_calls"] = tool_calls
-        return cls(**data)
-
-    def dict(self):
-        return json.dumps(get_dict_from_nested_dataclasses(self))
-
-
-def parse_json_if_needed(arguments: Union[str, dict]) -> Union[str, dict]:
-    if isinstance(arguments, dict):
-        return arguments
-    else:
-        try:
-            return json.loads(arguments)
-        except Exception:
-            return arguments
-
-
-class MessageRole(str, Enum):
-    USER = "user"
-    ASSISTANT = "assistant"
-    SYSTEM = "system"
-    TOOL_CALL = "tool-call"
-    TOOL_RESPONSE = "tool-response"
-
-    @classmethod
-    def roles(cls):
-        return [r.value for r in cls]
-
-
-tool_role_conversions = {
-    MessageRole.TOOL_CALL: MessageRole.ASSISTANT,
-    MessageRole.TOOL_RESPONSE: MessageRole.USER,
-}
-
-
-def get_tool_json_schema(tool: Tool) -> Dict:
-    properties = deepcopy(tool.inputs)
-    required = []
-    for key, value in properties.items():
-        if value["type"] == "any":
-            value["type"] = "string"
-        if not ("nullable" in value and value["nullable"]):
-            required.append(key)
-    return {
-        "type": "function",
-        "function": {
-            "name": tool.name,
-            "description": tool.description,
-            "parameters": {
-                "type": "object",
-                "properties": properties,
-                "required": required,
-            },
-        },
-    }
-
-
-def remove_stop_sequences(content: str, stop_sequences: List[str]) -> str:
-    for stop_seq in stop_sequences:
-        if content[-len(stop_seq) :] == stop_seq:
-            content = content[: -len(stop_seq)]
-    return content
-
-
-def get_clean_message_list(
-    message_list: List[Dict[str, str]],
-    role_conversions: Dict[MessageRole, MessageRole] = {},
-    convert_images_to_image_urls: bool = False,
-    flatten_messages_as_text: bool = False,
-) -> List[Dict[str, str]]:
-    """
-    Subsequent messages with the same role will be concatenated to a single message.
-    output_message_list is a list of messages that will be used to generate the final message that is chat template compatible with transformers LLM chat template.
-
-    Args:
-        message_list (`list[dict[str, str]]`): List of chat messages.
-        role_conversions (`dict[MessageRole, MessageRole]`, *optional* ): Mapping to convert roles.
-        convert_images_to_image_urls (`bool`, default `False`): Whether to convert images to image URLs.
-        flatten_messages_as_text (`bool`, default `False`): Whether to flatten messages as text.
-    """
-    output_message_list = []
-    message_list = deepcopy(message_list)  # Avoid modifying the original list
-    for message in message_list:
-        role = message["role"]
-        if role not in MessageRole.roles():
-            raise ValueError(
-                f"Incorrect role {role}, only {MessageRole.roles()} are supported for now."
-            )
-
-        if role in role_conversions:
-            message["role"] = role_conversions[role]
-        # encode images if needed
-        if isinstance(message["content"], list):
-            for element in message["content"]:
-                if element["type"] == "image":
-                    assert (
-                        not flatten_messages_as_text
-                    ), f"Cannot use images with {flatten_messages_as_text=}"
-                    if convert_images_to_image_urls:
-                        element.update(
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": make_image_url(
-                                        encode_image_base64(element.pop("image"))
-                                    )
-                                },
-                            }
-                        )
-                    else:
-                        element["image"] = encode_image_base64(element["image"])
-
-        if (
-            len(output_message_list) > 0
-            and message["role"] == output_message_list[-1]["role"]
-        ):
-            assert isinstance(message["content"], list), "Error: wrong content:" + str(
-                message["content"]
-            )
-            if flatten_messages_as_text:
-                output_message_list[-1]["content"] += message["content"][0]["text"]
-            else:
-                output_message_list[-1]["content"] += message["content"]
-        else:
-            if flatten_messages_as_text:
-                content = message["content"][0]["text"]
-            else:
-                content = message["content"]
-            output_message_list.append({"role": message["role"], "content": content})
-    return output_message_list
-
-
-class Model:
-    def __init__(
-        self,
-        flatten_messages_as_text: bool = False,
-        tool_name_key: str = "name",
-        tool_arguments_key: str = "arguments",
-        **kwargs,
-    ):
-        self.flatten_messages_as_text = flatten_messages_as_text
-        self.tool_name_key = tool_name_key
-        self.tool_arguments_key = tool_arguments_key
-        self.kwargs = kwargs
-        self.last_input_token_count = None
-        self.last_output_token_count = None
-
-    def _prepare_completion_kwargs(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        custom_role_conversions: Optional[Dict[str, str]] = None,
-        convert_images_to_image_urls: bool = False,
-        **kwargs,
-    ) -> Dict:
-        """
-        Prepare parameters required for model invocation, handling parameter priorities.
-
-        Parameter priority from high to low:
-        1. Explicitly passed kwargs
-        2. Specific parameters (stop_sequences, grammar, etc.)
-        3. Default values in self.kwargs
-        """
-        # Clean and standardize the message list
-        messages = get_clean_message_list(
-            messages,
-            role_conversions=custom_role_conversions or tool_role_conversions,
-            convert_images_to_image_urls=convert_images_to_image_urls,
-            flatten_messages_as_text=self.flatten_messages_as_text,
-        )
-
-        # Use self.kwargs as the base configuration
-        completion_kwargs = {
-            **self.kwargs,
-            "messages": messages,
-        }
-
-        # Handle specific parameters
-        if stop_sequences is not None:
-            completion_kwargs["stop"] = stop_sequences
-        if grammar is not None:
-            completion_kwargs["grammar"] = grammar
-
-        # Finally, use the passed-in kwargs to override all settings
-        completion_kwargs.update(kwargs)
-
-        return completion_kwargs
-
-    def get_token_counts(self) -> Dict[str, int]:
-        return {
-            "input_token_count": self.last_input_token_count,
-            "output_token_count": self.last_output_token_count,
-        }
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        """Process the input messages and return the model's response.
-
-        Parameters:
-            messages (`List[Dict[str, str]]`):
-                A list of message dictionaries to be processed. Each dictionary should have the structure `{"role": "user/system", "content": "message content"}`.
-            stop_sequences (`List[str]`, *optional*):
-                A list of strings that will stop the generation if encountered in the model's output.
-            grammar (`str`, *optional*):
-                The grammar or formatting structure to use in the model's response.
-            **kwargs:
-                Additional keyword arguments to be passed to the underlying model.
-
-        Returns:
-            `ChatMessage`: A chat message object containing the model's response.
-        """
-        pass  # To be implemented in child classes!
-
-    def to_dict(self) -> Dict:
-        """
-        Converts the model into a JSON-compatible dictionary.
-        """
-        model_dictionary = {
-            **self.kwargs,
-            "last_input_token_count": self.last_input_token_count,
-            "last_output_token_count": self.last_output_token_count,
-            "model_id": self.model_id,
-        }
-        for attribute in [
-            "custom_role_conversion",
-            "temperature",
-            "top_p",
-            "max_tokens",
-            "provider",
-            "timeout",
-            "api_base",
-            "torch_dtype",
-            "device_map",
-            "organization",
-            "project",
-            "azure_endpoint",
-        ]:
-            if hasattr(self, attribute):
-                model_dictionary[attribute] = getattr(self, attribute)
-
-        dangerous_attributes = ["token", "api_key"]
-        for attribute_name in dangerous_attributes:
-            if hasattr(self, attribute_name):
-                print(
-                    f"For security reasons, we do not export the `{attribute_name}` attribute of your model. Please export it manually."
-                )
-        return model_dictionary
-
-    @classmethod
-    def from_dict(cls, model_dictionary: Dict[str, Any]) -> "Model":
-        model_instance = cls(
-            **{
-                k: v
-                for k, v in model_dictionary.items()
-                if k not in ["last_input_token_count", "last_output_token_count"]
-            }
-        )
-        model_instance.last_input_token_count = model_dictionary.pop(
-            "last_input_token_count", None
-        )
-        model_instance.last_output_token_count = model_dictionary.pop(
-            "last_output_token_count", None
-        )
-        return model_instance
-
-
-class VLLMModel(Model):
-    """Model to use [vLLM](https://docs.vllm.ai/) for fast LLM inference and serving.
-
-    Parameters:
-        model_id (`str`):
-            The Hugging Face model ID to be used for inference.
-            This can be a path or model identifier from the Hugging Face model hub.
-    """
-
-    def __init__(self, model_id, **kwargs):
-        if not _is_package_available("vllm"):
-            raise ModuleNotFoundError(
-                "Please install 'vllm' extra to use VLLMModel: `pip install 'smolagents[vllm]'`"
-            )
-
-        from vllm import LLM
-        from vllm.transformers_utils.tokenizer import get_tokenizer
-
-        super().__init__(**kwargs)
-
-        self.model_id = model_id
-        self.model = LLM(model=model_id)
-        self.tokenizer = get_tokenizer(model_id)
-        self._is_vlm = False  # VLLMModel does not support vision models yet.
-
-    def cleanup(self):
-        import gc
-
-        import torch
-        from vllm.distributed.parallel_state import (
-            destroy_distributed_environment,
-            destroy_model_parallel,
-        )
-
-        destroy_model_parallel()
-        if self.model is not None:
-            # taken from https://github.com/vllm-project/vllm/issues/1908#issuecomment-2076870351
-            del self.model.llm_engine.model_executor.driver_worker
-        self.model = None
-        gc.collect()
-        destroy_distributed_environment()
-        torch.cuda.empty_cache()
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        from vllm import SamplingParams
-
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            flatten_messages_as_text=(not self._is_vlm),
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            **kwargs,
-        )
-        messages = completion_kwargs.pop("messages")
-        prepared_stop_sequences = completion_kwargs.pop("stop", [])
-        tools = completion_kwargs.pop("tools", None)
-        completion_kwargs.pop("tool_choice", None)
-
-        prompt = self.tokenizer.apply_chat_template(
-            messages,
-            tools=tools,
-            add_generation_prompt=True,
-            tokenize=False,
-        )
-
-        sampling_params = SamplingParams(
-            n=kwargs.get("n", 1),
-            temperature=kwargs.get("temperature", 0.0),
-            top_p=kwargs.get("top_p", 1.0),
-            top_k=kwargs.get("top_k", 1.0),
-            max_tokens=kwargs.get("max_tokens", 8192),
-            stop=prepared_stop_sequences,
-        )
-
-        out = self.model.generate(
-            prompt,
-            sampling_params=sampling_params,
-        )
-        output_text = out[0].outputs[0].text
-        self.last_input_token_count = len(out[0].prompt_token_ids)
-        self.last_output_token_count = len(out[0].outputs[0].token_ids)
-        chat_message = ChatMessage(
-            role=MessageRole.ASSISTANT,
-            content=output_text,
-            raw={"out": output_text, "completion_kwargs": completion_kwargs},
-        )
-        return chat_message
-
-
-class MLXModel(Model):
-    """A class to interact with models loaded using MLX on Apple silicon.
-
-    > [!TIP]
-    > You must have `mlx-lm` installed on your machine. Please run `pip install smolagents[mlx-lm]` if it's not the case.
-
-    Parameters:
-        model_id (str):
-            The Hugging Face model ID to be used for inference. This can be a path or model identifier from the Hugging Face model hub.
-        tool_name_key (str):
-            The key, which can usually be found in the model's chat template, for retrieving a tool name.
-        tool_arguments_key (str):
-            The key, which can usually be found in the model's chat template, for retrieving tool arguments.
-        trust_remote_code (bool):
-            Some models on the Hub require running remote code: for this model, you would have to set this flag to True.
-        kwargs (dict, *optional*):
-            Any additional keyword arguments that you want to use in model.generate(), for instance `max_tokens`.
-
-    Example:
-    ```python
-    >>> engine = MLXModel(
-    ...     model_id="mlx-community/Qwen2.5-Coder-32B-Instruct-4bit",
-    ...     max_tokens=10000,
-    ... )
-    >>> messages = [
-    ...     {
-    ...         "role": "user",
-    ...         "content": [
-    ...             {"type": "text", "text": "Explain quantum mechanics in simple terms."}
-    ...         ]
-    ...     }
-    ... ]
-    >>> response = engine(messages, stop_sequences=["END"])
-    >>> print(response)
-    "Quantum mechanics is the branch of physics that studies..."
-    ```
-    """
-
-    def __init__(
-        self,
-        model_id: str,
-        tool_name_key: str = "name",
-        tool_arguments_key: str = "arguments",
-        trust_remote_code: bool = False,
-        **kwargs,
-    ):
-        super().__init__(
-            flatten_messages_as_text=True, **kwargs
-        )  # mlx-lm doesn't support vision models
-        if not _is_package_available("mlx_lm"):
-            raise ModuleNotFoundError(
-                "Please install 'mlx-lm' extra to use 'MLXModel': `pip install 'smolagents[mlx-lm]'`"
-            )
-        import mlx_lm
-
-        self.model_id = model_id
-        self.model, self.tokenizer = mlx_lm.load(
-            model_id, tokenizer_config={"trust_remote_code": trust_remote_code}
-        )
-        self.stream_generate = mlx_lm.stream_generate
-        self.tool_name_key = tool_name_key
-        self.tool_arguments_key = tool_arguments_key
-        self.is_vlm = False  # mlx-lm doesn't support vision models
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            **kwargs,
-        )
-        messages = completion_kwargs.pop("messages")
-        prepared_stop_sequences = completion_kwargs.pop("stop", [])
-        tools = completion_kwargs.pop("tools", None)
-        completion_kwargs.pop("tool_choice", None)
-
-        prompt_ids = self.tokenizer.apply_chat_template(
-            messages,
-            tools=tools,
-            add_generation_prompt=True,
-        )
-
-        self.last_input_token_count = len(prompt_ids)
-        self.last_output_token_count = 0
-        text = ""
-
-        for _ in self.stream_generate(
-            self.model, self.tokenizer, prompt=prompt_ids, **completion_kwargs
-        ):
-            self.last_output_token_count += 1
-            text += _.text
-            for stop_sequence in prepared_stop_sequences:
-                stop_sequence_start = text.rfind(stop_sequence)
-                if stop_sequence_start != -1:
-                    text = text[:stop_sequence_start]
-                    found_stop_sequence = True
-                    break
-            if found_stop_sequence:
-                break
-
-        chat_message = ChatMessage(
-            role=MessageRole.ASSISTANT,
-            content=text,
-            raw={"out": text, "completion_kwargs": completion_kwargs},
-        )
-        return chat_message
-
-
-class TransformersModel(Model):
-    """A class that uses Hugging Face's Transformers library for language model interaction.
-
-    This model allows you to load and use Hugging Face's models locally using the Transformers library. It supports features like stop sequences and grammar customization.
-
-    > [!TIP]
-    > You must have `transformers` and `torch` installed on your machine. Please run `pip install smolagents[transformers]` if it's not the case.
-
-    Parameters:
-        model_id (`str`):
-            The Hugging Face model ID to be used for inference. This can be a path or model identifier from the Hugging Face model hub.
-            For example, `"Qwen/Qwen2.5-Coder-32B-Instruct"`.
-        device_map (`str`, *optional*):
-            The device_map to initialize your model with.
-        torch_dtype (`str`, *optional*):
-            The torch_dtype to initialize your model with.
-        trust_remote_code (bool, default `False`):
-            Some models on the Hub require running remote code: for this model, you would have to set this flag to True.
-        kwargs (dict, *optional*):
-            Any additional keyword arguments that you want to use in model.generate(), for instance `max_new_tokens` or `device`.
-        **kwargs:
-            Additional keyword arguments to pass to `model.generate()`, for instance `max_new_tokens` or `device`.
-    Raises:
-        ValueError:
-            If the model name is not provided.
-
-    Example:
-    ```python
-    >>> engine = TransformersModel(
-    ...     model_id="Qwen/Qwen2.5-Coder-32B-Instruct",
-    ...     device="cuda",
-    ...     max_new_tokens=5000,
-    ... )
-    >>> messages = [{"role": "user", "content": "Explain quantum mechanics in simple terms."}]
-    >>> response = engine(messages, stop_sequences=["END"])
-    >>> print(response)
-    "Quantum mechanics is the branch of physics that studies..."
-    ```
-    """
-
-    def __init__(
-        self,
-        model_id: Optional[str] = None,
-        device_map: Optional[str] = None,
-        torch_dtype: Optional[str] = None,
-        trust_remote_code: bool = False,
-        **kwargs,
-    ):
-        if not is_torch_available() or not _is_package_available("transformers"):
-            raise ModuleNotFoundError(
-                "Please install 'transformers' extra to use 'TransformersModel': `pip install 'smolagents[transformers]'`"
-            )
-        import torch
-        from transformers import (
-            AutoModelForCausalLM,
-            AutoModelForImageTextToText,
-            AutoProcessor,
-            AutoTokenizer,
-        )
-
-        if not model_id:
-            warnings.warn(
-                "The 'model_id' parameter will be required in version 2.0.0. "
-                "Please update your code to pass this parameter to avoid future errors. "
-                "For now, it defaults to 'HuggingFaceTB/SmolLM2-1.7B-Instruct'.",
-                FutureWarning,
-            )
-            model_id = "HuggingFaceTB/SmolLM2-1.7B-Instruct"
-        self.model_id = model_id
-
-        default_max_tokens = 5000
-        max_new_tokens = kwargs.get("max_new_tokens") or kwargs.get("max_tokens")
-        if not max_new_tokens:
-            kwargs["max_new_tokens"] = default_max_tokens
-            logger.warning(
-                f"`max_new_tokens` not provided, using this default value for `max_new_tokens`: {default_max_tokens}"
-            )
-
-        if device_map is None:
-            device_map = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {device_map}")
-        self._is_vlm = False
-        try:
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_id,
-                device_map=device_map,
-                torch_dtype=torch_dtype,
-                trust_remote_code=trust_remote_code,
-            )
-            self.tokenizer = AutoTokenizer.from_pretrained(model_id)
-        except ValueError as e:
-            if "Unrecognized configuration class" in str(e):
-                self.model = AutoModelForImageTextToText.from_pretrained(
-                    model_id,
-                    device_map=device_map,
-                    torch_dtype=torch_dtype,
-                    trust_remote_code=trust_remote_code,
-                )
-                self.processor = AutoProcessor.from_pretrained(model_id)
-                self._is_vlm = True
-            else:
-                raise e
-        except Exception as e:
-            raise ValueError(
-                f"Failed to load tokenizer and model for {model_id=}: {e}"
-            ) from e
-        super().__init__(flatten_messages_as_text=not self._is_vlm, **kwargs)
-
-    def make_stopping_criteria(
-        self, stop_sequences: List[str], tokenizer
-    ) -> "StoppingCriteriaList":
-        from transformers import StoppingCriteria, StoppingCriteriaList
-
-        class StopOnStrings(StoppingCriteria):
-            def __init__(self, stop_strings: List[str], tokenizer):
-                self.stop_strings = stop_strings
-                self.tokenizer = tokenizer
-                self.stream = ""
-
-            def reset(self):
-                self.stream = ""
-
-            def __call__(self, input_ids, scores, **kwargs):
-                generated = self.tokenizer.decode(
-                    input_ids[0][-1], skip_special_tokens=True
-                )
-                self.stream += generated
-                if any(
-                    [
-                        self.stream.endswith(stop_string)
-                        for stop_string in self.stop_strings
-                    ]
-                ):
-                    return True
-                return False
-
-        return StoppingCriteriaList([StopOnStrings(stop_sequences, tokenizer)])
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            **kwargs,
-        )
-
-        messages = completion_kwargs.pop("messages")
-        stop_sequences = completion_kwargs.pop("stop", None)
-
-        max_new_tokens = (
-            kwargs.get("max_new_tokens")
-            or kwargs.get("max_tokens")
-            or self.kwargs.get("max_new_tokens")
-            or self.kwargs.get("max_tokens")
-        )
-
-        if max_new_tokens:
-            completion_kwargs["max_new_tokens"] = max_new_tokens
-
-        if hasattr(self, "processor"):
-            prompt_tensor = self.processor.apply_chat_template(
-                messages,
-                return_tensors="pt",
-                tokenize=True,
-                return_dict=True,
-                add_generation_prompt=True,
-            )
-        else:
-            prompt_tensor = self.tokenizer.apply_chat_template(
-                messages,
-                return_tensors="pt",
-                return_dict=True,
-                add_generation_prompt=True,
-            )
-
-        prompt_tensor = prompt_tensor.to(self.model.device)
-        count_prompt_tokens = prompt_tensor["input_ids"].shape[1]
-
-        if stop_sequences:
-            stopping_criteria = self.make_stopping_criteria(
-                stop_sequences,
-                tokenizer=(
-                    self.processor if hasattr(self, "processor") else self.tokenizer
-                ),
-            )
-        else:
-            stopping_criteria = None
-
-        out = self.model.generate(
-            **prompt_tensor,
-            stopping_criteria=stopping_criteria,
-            **completion_kwargs,
-        )
-        generated_tokens = out[0, count_prompt_tokens:]
-        if hasattr(self, "processor"):
-            output_text = self.processor.decode(
-                generated_tokens, skip_special_tokens=True
-            )
-        else:
-            output_text = self.tokenizer.decode(
-                generated_tokens, skip_special_tokens=True
-            )
-        self.last_input_token_count = count_prompt_tokens
-        self.last_output_token_count = len(generated_tokens)
-
-        if stop_sequences is not None:
-            output_text = remove_stop_sequences(output_text, stop_sequences)
-
-        chat_message = ChatMessage(
-            role=MessageRole.ASSISTANT,
-            content=output_text,
-            raw={"out": output_text, "completion_kwargs": completion_kwargs},
-        )
-        return chat_message
-
-
-class ApiModel(Model):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-
-    def postprocess_message(
-        self, message: ChatMessage
-    ) -> ChatMessage:
-        """Sometimes APIs fail to properly parse a tool call: this function tries to parse."""
-        message.role = MessageRole.ASSISTANT  # Overwrite role if needed
-        for tool_call in message.tool_calls:
-            tool_call.function.arguments = parse_json_if_needed(
-                tool_call.function.arguments
-            )
-        return message
-
-
-class LiteLLMModel(ApiModel):
-    """Model to use [LiteLLM Python SDK](https://docs.litellm.ai/docs/#litellm-python-sdk) to access hundreds of LLMs.
-
-    Parameters:
-        model_id (`str`):
-            The model identifier to use on the server (e.g. "robobrain").
-        api_base (`str`, *optional*):
-            The base URL of the provider API to call the model.
-        api_key (`str`, *optional*):
-            The API key to use for authentication.
-        custom_role_conversions (`dict[str, str]`, *optional*):
-            Custom role conversion mapping to convert message roles in others.
-            Useful for specific models that do not support specific message roles like "system".
-        flatten_messages_as_text (`bool`, *optional*): Whether to flatten messages as text.
-            Defaults to `True` for models that start with "ollama", "groq", "cerebras".
-        **kwargs:
-            Additional keyword arguments to pass to the OpenAI API.
-    """
-
-    def __init__(
-        self,
-        model_id: Optional[str] = None,
-        api_base=None,
-        api_key=None,
-        custom_role_conversions: Optional[Dict[str, str]] = None,
-        flatten_messages_as_text: Optional[bool] = None,
-        **kwargs,
-    ):
-        if not model_id:
-            warnings.warn(
-                "The 'model_id' parameter will be required in version 2.0.0. "
-                "Please update your code to pass this parameter to avoid future errors. "
-                "For now, it defaults to 'anthropic/claude-3-5-sonnet-20240620'.",
-                FutureWarning,
-            )
-            model_id = "anthropic/claude-3-5-sonnet-20240620"
-        self.model_id = model_id
-        self.api_base = api_base
-        self.api_key = api_key
-        self.custom_role_conversions = custom_role_conversions
-        flatten_messages_as_text = (
-            flatten_messages_as_text
-            if flatten_messages_as_text is not None
-            else self.model_id.startswith(("ollama", "groq", "cerebras"))
-        )
-        super().__init__(flatten_messages_as_text=flatten_messages_as_text, **kwargs)
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        try:
-            import litellm
-        except ModuleNotFoundError:
-            raise ModuleNotFoundError(
-                "Please install 'litellm' extra to use LiteLLMModel: `pip install 'smolagents[litellm]'`"
-            )
-
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            model=self.model_id,
-            api_base=self.api_base,
-            api_key=self.api_key,
-            convert_images_to_image_urls=True,
-            custom_role_conversions=self.custom_role_conversions,
-            **kwargs,
-        )
-
-        response = litellm.completion(**completion_kwargs)
-
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
-        first_message = ChatMessage.from_dict(
-            response.choices[0].message.model_dump(
-                include={"role", "content", "tool_calls"}
-            )
-        )
-        first_message.raw = response
-        return self.postprocess_message(first_message)
-
-
-class HfApiModel(ApiModel):
-    """A class to interact with Hugging Face's Inference API for language model interaction.
-
-    This model allows you to communicate with Hugging Face's models using the Inference API. It can be used in both serverless mode or with a dedicated endpoint, supporting features like stop sequences and grammar customization.
-
-    Parameters:
-        model_id (`str`, *optional*, default `"Qwen/Qwen2.5-Coder-32B-Instruct"`):
-            The Hugging Face model ID to be used for inference.
-            This can be a model identifier from the Hugging Face model hub or a URL to a deployed Inference Endpoint.
-            Currently, it defaults to `"Qwen/Qwen2.5-Coder-32B-Instruct"`, but this may change in the future.
-        provider (`str`, *optional*):
-            Name of the provider to use for inference. Can be `"replicate"`, `"together"`, `"fal-ai"`, `"sambanova"` or `"hf-inference"`.
-            defaults to hf-inference (HF Inference API).
-        token (`str`, *optional*):
-            Token used by the Hugging Face API for authentication. This token need to be authorized 'Make calls to the serverless Inference API'.
-            If the model is gated (like Llama-3 models), the token also needs 'Read access to contents of all public gated repos you can access'.
-            If not provided, the class will try to use environment variable 'HF_TOKEN', else use the token stored in the Hugging Face CLI configuration.
-        timeout (`int`, *optional*, defaults to 120):
-            Timeout for the API request, in seconds.
-        custom_role_conversions (`dict[str, str]`, *optional*):
-            Custom role conversion mapping to convert message roles in others.
-            Useful for specific models that do not support specific message roles like "system".
-        **kwargs:
-            Additional keyword arguments to pass to the Hugging Face API.
-
-    Raises:
-        ValueError:
-            If the model name is not provided.
-
-    Example:
-    ```python
-    >>> engine = HfApiModel(
-    ...     model_id="Qwen/Qwen2.5-Coder-32B-Instruct",
-    ...     token="your_hf_token_here",
-    ...     max_tokens=5000,
-    ... )
-    >>> messages = [{"role": "user", "content": "Explain quantum mechanics in simple terms."}]
-    >>> response = engine(messages, stop_sequences=["END"])
-    >>> print(response)
-    "Quantum mechanics is the branch of physics that studies..."
-    ```
-    """
-
-    def __init__(
-        self,
-        model_id: str = "Qwen/Qwen2.5-Coder-32B-Instruct",
-        provider: Optional[str] = None,
-        token: Optional[str] = None,
-        timeout: Optional[int] = 120,
-        custom_role_conversions: Optional[Dict[str, str]] = None,
-        **kwargs,
-    ):
-        from huggingface_hub import InferenceClient
-
-        super().__init__(**kwargs)
-        self.model_id = model_id
-        self.provider = provider
-        if token is None:
-            token = os.getenv("HF_TOKEN")
-        self.client = InferenceClient(
-            self.model_id, provider=provider, token=token, timeout=timeout
-        )
-        self.custom_role_conversions = custom_role_conversions
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            convert_images_to_image_urls=True,
-            custom_role_conversions=self.custom_role_conversions,
-            **kwargs,
-        )
-        response = self.client.chat_completion(**completion_kwargs)
-
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
-        first_message = ChatMessage.from_hf_api(
-            response.choices[0].message, raw=response
-        )
-        return self.postprocess_message(first_message)
-
-
-class OpenAIServerModel(ApiModel):
-    """This model connects to an OpenAI-compatible API server.
-
-    Parameters:
-        model_id (`str`):
-            The model identifier to use on the server (e.g. "robobrain").
-        api_base (`str`, *optional*):
-            The base URL of the OpenAI-compatible API server.
-        api_key (`str`, *optional*):
-            The API key to use for authentication.
-        organization (`str`, *optional*):
-            The organization to use for the API request.
-        project (`str`, *optional*):
-            The project to use for the API request.
-        client_kwargs (`dict[str, Any]`, *optional*):
-            Additional keyword arguments to pass to the OpenAI client (like organization, project, max_retries etc.).
-        custom_role_conversions (`dict[str, str]`, *optional*):
-            Custom role conversion mapping to convert message roles in others.
-            Useful for specific models that do not support specific message roles like "system".
-        flatten_messages_as_text (`bool`, default `False`):
-            Whether to flatten messages as text.
-        **kwargs:
-            Additional keyword arguments to pass to the OpenAI API.
-    """
-
-    def __init__(
-        self,
-        model_id: str,
-        api_base: Optional[str] = None,
-        api_key: Optional[str] = None,
-        organization: Optional[str] = None,
-        project: Optional[str] = None,
-        client_kwargs: Optional[Dict[str, Any]] = None,
-        custom_role_conversions: Optional[Dict[str, str]] = None,
-        flatten_messages_as_text: bool = False,
-        **kwargs,
-    ):
-        if importlib.util.find_spec("openai") is None:
-            raise ModuleNotFoundError(
-                "Please install 'openai' extra to use OpenAIServerModel: `pip install 'smolagents[openai]'`"
-            )
-        super().__init__(flatten_messages_as_text=flatten_messages_as_text, **kwargs)
-        self.model_id = model_id
-        self.custom_role_conversions = custom_role_conversions
-        self.client_kwargs = client_kwargs or {}
-        self.client_kwargs.update(
-            {
-                "api_key": api_key,
-                "base_url": api_base,
-                "organization": organization,
-                "project": project,
-            }
-        )
-        self.client = self.create_client()
-
-    def create_client(self):
-        import openai
-
-        return openai.OpenAI(**self.client_kwargs)
-
-    def __call__(
-        self,
-        messages: List[Dict[str, str]],
-        stop_sequences: Optional[List[str]] = None,
-        grammar: Optional[str] = None,
-        **kwargs,
-    ) -> ChatMessage:
-        completion_kwargs = self._prepare_completion_kwargs(
-            messages=messages,
-            stop_sequences=stop_sequences,
-            grammar=grammar,
-            model=self.model_id,
-            custom_role_conversions=self.custom_role_conversions,
-            convert_images_to_image_urls=True,
-            tool_choice="auto",
-            **kwargs,
-        )
-        response = self.client.chat.completions.create(**completion_kwargs)
-        self.last_input_token_count = response.usage.prompt_tokens
-        self.last_output_token_count = response.usage.completion_tokens
-
-        first_message = ChatMessage.from_dict(
-            response.choices[0].message.model_dump(
-                include={"role", "content", "tool_calls"}
-            )
-        )
-        first_message.raw = response
-        return self.postprocess_message(first_message)
-
-
-class AzureOpenAIServerModel(OpenAIServerModel):
-    """This model connects to an Azure OpenAI deployment.
-
-    Parameters:
-        model_id (`str`):
-            The model deployment name to use when connecting (e.g. "robobrain").
-        azure_endpoint (`str`, *optional*):
-            The Azure endpoint, including the resource, e.g. `https://example-resource.azure.openai.com/`. If not provided, it will be inferred from the `AZURE_OPENAI_ENDPOINT` environment variable.
-        api_key (`str`, *optional*):
-            The API key to use for authentication. If not provided, it will be inferred from the `AZURE_OPENAI_API_KEY` environment variable.
-        api_version (`str`, *optional*):
-            The API version to use. If not provided, it will be inferred from the `OPENAI_API_VERSION` environment variable.
-        client_kwargs (`dict[str, Any]`, *optional*):
-            Additional keyword arguments to pass to the AzureOpenAI client (like organization, project, max_retries etc.).
-        custom_role_conversions (`dict[str, str]`, *optional*):
-            Custom role conversion mapping to convert message roles in others.
-            Useful for specific models that do not support specific message roles like "system".
-        **kwargs:
-            Additional keyword arguments to pass to the Azure OpenAI API.
-    """
-
-    def __init__(
-        self,
-        model_id: str,
-        azure_endpoint: Optional[str] = None,
-        azure_deployment: Optional[str] = None,
-        api_key: Optional[str] = None,
-        api_version: Optional[str] = None,
-        client_kwargs: Optional[Dict[str, Any]] = None,
-        custom_role_conversions: Optional[Dict[str, str]] = None,
-        **kwargs,
-    ):
-        if importlib.util.find_spec("openai") is None:
-            raise ModuleNotFoundError(
-                "Please install 'openai' extra to use AzureOpenAIServerModel: `pip install 'smolagents[openai]'`"
-            )
-        client_kwargs = client_kwargs or {}
-        client_kwargs.update(
-            {
-                "api_version": api_version,
-                "azure_endpoint": azure_endpoint,
-                "azure_deployment": azure_deployment,
-            }
-        )
-        super().__init__(
-            model_id=model_id,
-            api_key=api_key,
-            client_kwargs=client_kwargs,
-            custom_role_conversions=custom_role_conversions,
-            **kwargs,
-        )
-
-    def create_client(self):
-        import openai
-
-        return openai.AzureOpenAI(**self.client_kwargs)
-
-
-__all__ = [
-    "MessageRole",
-    "tool_role_conversions",
-    "get_clean_message_list",
-    "Model",
-    "MLXModel",
-    "TransformersModel",
-    "HfApiModel",
-    "LiteLLMModel",
-    "OpenAIServerModel",
-    "VLLMModel",
-    "AzureOpenAIServerModel",
-    "ChatMessage",
-]
+###############################################################
+# Copyright 2025 BAAI. All rights reserved.
+###############################################################
+# Copyright 2024 The HuggingFace Inc. team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import warnings
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Union
+
+from huggingface_hub.utils import is_torch_available
+from tools.tools import Tool
+from tools.utils import (
+    _is_package_available,
+    encode_image_base64,
+    encode_image_data_url,
+    make_image_url,
+    parse_json_blob,
+)
+
+if TYPE_CHECKING:
+    from transformers import StoppingCriteriaList
+
+try:
+    # Import once at module load: repeated importlib.util.find_spec walks the
+    # filesystem for every model instance, which adds up when many agents spawn.
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    # C-accelerated JSON codec for the per-call message (de)serialization;
+    # the stdlib codec is used when orjson is not installed.
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+else:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# Clients targeting the same server are shared across model instances so that
+# the underlying httpx connection pool (TCP + TLS) is reused instead of being
+# rebuilt per agent.
+_CLIENT_CACHE: Dict[tuple, Any] = {}
+_CLIENT_CACHE_LOCK = threading.Lock()
+
+
+def _get_cached_client(client_cls, client_kwargs: Dict[str, Any]):
+    key_items = []
+    for k, v in client_kwargs.items():
+        if isinstance(v, (str, int, float, type(None))):
+            key_items.append((k, v))
+        elif k == "http_client":
+            # The shared transport below is itself cached, so its identity is
+            # a stable cache key component.
+            key_items.append((k, id(v)))
+        else:
+            # Fall back to a dedicated client on unhashable kwargs.
+            return client_cls(**client_kwargs)
+    key = (client_cls.__name__, tuple(sorted(key_items)))
+    with _CLIENT_CACHE_LOCK:
+        client = _CLIENT_CACHE.get(key)
+        if client is None:
+            client = _CLIENT_CACHE[key] = client_cls(**client_kwargs)
+    return client
+
+
+_HTTP_CLIENT_CACHE: Dict[Any, Any] = {}
+
+
+def _get_shared_http_client(timeout=None):
+    """One keep-alive httpx transport per timeout setting.
+
+    Sharing the transport across OpenAI clients keeps connections warm
+    between bursts, and HTTP/2 (when the `h2` extra is installed) lets
+    concurrent in-flight requests multiplex one connection.
+    """
+    import httpx
+
+    client = _HTTP_CLIENT_CACHE.get(timeout)
+    if client is None:
+        limits = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+        kwargs = {"limits": limits}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        try:
+            client = httpx.Client(http2=True, **kwargs)
+        except ImportError:
+            client = httpx.Client(**kwargs)
+        _HTTP_CLIENT_CACHE[timeout] = client
+    return client
+
+
+def _with_shared_http_client(client_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    if "http_client" in client_kwargs:
+        return client_kwargs
+    return {
+        **client_kwargs,
+        "http_client": _get_shared_http_client(client_kwargs.get("timeout")),
+    }
+
+
+DEFAULT_JSONAGENT_REGEX_GRAMMAR = {
+    "type": "regex",
+    "value": 'Thought: .+?\\nAction:\\n\\{\\n\\s{4}"action":\\s"[^"\\n]+",\\n\\s{4}"action_input":\\s"[^"\\n]+"\\n\\}\\n<end_code>',
+}
+
+DEFAULT_CODEAGENT_REGEX_GRAMMAR = {
+    "type": "regex",
+    "value": "Thought: .+?\\nCode:\\n```(?:py|python)?\\n(?:.|\\s)+?\\n```<end_code>",
+}
+
+# Compiled once at import time. Constrained-decoding backends consume the raw
+# source strings in the dicts above; anything matching locally should use
+# these instead of recompiling the pattern per call.
+DEFAULT_JSONAGENT_REGEX_PATTERN = re.compile(
+    DEFAULT_JSONAGENT_REGEX_GRAMMAR["value"], re.DOTALL
+)
+DEFAULT_CODEAGENT_REGEX_PATTERN = re.compile(
+    DEFAULT_CODEAGENT_REGEX_GRAMMAR["value"], re.DOTALL
+)
+
+
+def get_dict_from_nested_dataclasses(obj, ignore_key=None):
+    # Walks dataclass fields directly instead of going through `asdict`,
+    # which deep-copies every value (including `raw` provider payloads)
+    # before the ignore filter can drop them.
+    def convert(obj):
+        if hasattr(obj, "__dataclass_fields__"):
+            return {
+                name: convert(getattr(obj, name))
+                for name in obj.__dataclass_fields__
+                if name != ignore_key
+            }
+        if isinstance(obj, list):
+            return [convert(item) for item in obj]
+        if isinstance(obj, dict):
+            return {key: convert(value) for key, value in obj.items()}
+        return obj
+
+    return convert(obj)
+
+
+@dataclass(slots=True)
+class ChatMessageToolCallDefinition:
+    arguments: Any
+    name: str
+    description: Optional[str] = None
+
+    @classmethod
+    def from_hf_api(cls, tool_call_definition) -> "ChatMessageToolCallDefinition":
+        return cls(
+            arguments=tool_call_definition.arguments,
+            name=tool_call_definition.name,
+            description=tool_call_definition.description,
+        )
+
+
+@dataclass(slots=True)
+class ChatMessageToolCall:
+    function: ChatMessageToolCallDefinition
+    id: str
+    type: str
+
+    @classmethod
+    def from_hf_api(cls, tool_call) -> "ChatMessageToolCall":
+        return cls(
+            function=ChatMessageToolCallDefinition.from_hf_api(tool_call.function),
+            id=tool_call.id,
+            type=tool_call.type,
+        )
+
+
+@dataclass(slots=True)
+class ChatMessage:
+    role: str
+    content: Optional[str] = None
+    tool_calls: Optional[List[ChatMessageToolCall]] = None
+    # Stores the raw output from the API; kept out of repr so logging a
+    # message never stringifies the whole provider response.
+    raw: Optional[Any] = field(default=None, repr=False)
+
+    def model_dump_json(self):
+        return _json_dumps(get_dict_from_nested_dataclasses(self, ignore_key="raw"))
+
+    @classmethod
+    def from_hf_api(cls, message, raw) -> "ChatMessage":
+        tool_calls = None
+        if getattr(message, "tool_calls", None) is not None:
+            tool_calls = [
+                ChatMessageToolCall.from_hf_api(tool_call)
+                for tool_call in message.tool_calls
+            ]
+        return cls(
+            role=message.role, content=message.content, tool_calls=tool_calls, raw=raw
+        )
+
+    @classmethod
+    def from_openai(cls, message, raw) -> "ChatMessage":
+        # Reads the response attributes directly instead of paying for a full
+        # pydantic model_dump followed by from_dict reconstruction. An empty
+        # tool_calls list is preserved as such (like from_hf_api does): some
+        # OpenAI-compatible servers send [] for plain-content answers, and
+        # downstream code distinguishes "no tool calls" from "absent field".
+        tool_calls = None
+        if getattr(message, "tool_calls", None) is not None:
+            tool_calls = [
+                ChatMessageToolCall(
+                    function=ChatMessageToolCallDefinition(
+                        arguments=tool_call.function.arguments,
+                        name=tool_call.function.name,
+                    ),
+                    id=tool_call.id,
+                    type=tool_call.type,
+                )
+                for tool_call in message.tool_calls
+            ]
+        return cls(
+            role=message.role, content=message.content, tool_calls=tool_calls, raw=raw
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChatMessage":
+        if data.get("tool_calls"):
+            tool_calls = [
+                ChatMessageToolCall(
+                    function=ChatMessageToolCallDefinition(**tc["function"]),
+                    id=tc["id"],
+                    type=tc["type"],
+                )
+                for tc in data["tool_calls"]
+            ]
+            data["tool_calls"] = tool_calls
+        return cls(**data)
+
+    def dict(self):
+        return _json_dumps(get_dict_from_nested_dataclasses(self))
+
+
+def parse_json_if_needed(arguments: Union[str, dict]) -> Union[str, dict]:
+    if isinstance(arguments, dict):
+        return arguments
+    # Most non-dict arguments are free text; checking the first character is
+    # far cheaper than raising and swallowing a decode error for each one.
+    stripped = arguments.lstrip()
+    if not stripped or stripped[0] not in '{["0123456789-tfn':
+        return arguments
+    try:
+        return _json_loads(arguments)
+    except Exception:
+        return arguments
+
+
+class MessageRole(str, Enum):
+    USER = "user"
+    ASSISTANT = "assistant"
+    SYSTEM = "system"
+    TOOL_CALL = "tool-call"
+    TOOL_RESPONSE = "tool-response"
+
+    @classmethod
+    def roles(cls):
+        return list(_VALID_ROLES)
+
+
+# Intern the role value strings once: hyphenated values like "tool-call" are
+# not auto-interned by the compiler, and interning turns the role equality
+# checks in the message-cleaning loop into pointer compares.
+for _role in MessageRole:
+    _role._value_ = sys.intern(_role._value_)
+del _role
+
+# Frozen set for O(1) role validation without rebuilding a list per message.
+_VALID_ROLES = frozenset(r.value for r in MessageRole)
+
+# Plain-string role constants: comparing and hashing these skips the Enum
+# __eq__/__call__ dispatch in the per-message hot paths.
+USER, ASSISTANT, SYSTEM, TOOL_CALL, TOOL_RESPONSE = (r.value for r in MessageRole)
+
+tool_role_conversions = {
+    TOOL_CALL: ASSISTANT,
+    TOOL_RESPONSE: USER,
+}
+
+
+def get_tool_json_schema(tool: Tool) -> Dict:
+    # Tool schemas are static after construction, so the converted schema is
+    # memoized on the tool itself and rebuilt only on the first call.
+    cached = getattr(tool, "_cached_json_schema", None)
+    if cached is not None:
+        return cached
+    # Input specs are flat dicts, so copying one level deep is enough to keep
+    # the "any" -> "string" rewrite below from leaking into `tool.inputs`.
+    properties = {key: dict(value) for key, value in tool.inputs.items()}
+    required = []
+    for key, value in properties.items():
+        if value["type"] == "any":
+            value["type"] = "string"
+        if not ("nullable" in value and value["nullable"]):
+            required.append(key)
+    schema = {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
+    try:
+        tool._cached_json_schema = schema
+    except AttributeError:
+        pass  # Tools with __slots__ simply skip the cache.
+    return schema
+
+
+@lru_cache(maxsize=64)
+def _stop_tail_pattern(stop_sequences: tuple) -> "re.Pattern":
+    # `+` so stacked trailing stops (e.g. "...STOP1STOP2") are all removed,
+    # matching the per-sequence stripping the loop version performed.
+    return re.compile(
+        "(?:" + "|".join(re.escape(stop_seq) for stop_seq in stop_sequences) + r")+\Z"
+    )
+
+
+def remove_stop_sequences(content: str, stop_sequences: List[str]) -> str:
+    if not stop_sequences:
+        return content
+    # One C-level regex match against a cached alternation, instead of a
+    # Python-level slice-and-compare per stop sequence on every completion.
+    return _stop_tail_pattern(tuple(stop_sequences)).sub("", content)
+
+
+def get_clean_message_list(
+    message_list: List[Dict[str, str]],
+    role_conversions: Dict[MessageRole, MessageRole] = {},
+    convert_images_to_image_urls: bool = False,
+    flatten_messages_as_text: bool = False,
+    copy: bool = True,
+    image_store: Optional[Dict[int, Any]] = None,
+) -> List[Dict[str, str]]:
+    """
+    Subsequent messages with the same role will be concatenated to a single message.
+    output_message_list is a list of messages that will be used to generate the final message that is chat template compatible with transformers LLM chat template.
+
+    Args:
+        message_list (`list[dict[str, str]]`): List of chat messages.
+        role_conversions (`dict[MessageRole, MessageRole]`, *optional* ): Mapping to convert roles.
+        convert_images_to_image_urls (`bool`, default `False`): Whether to convert images to image URLs.
+        flatten_messages_as_text (`bool`, default `False`): Whether to flatten messages as text.
+        copy (`bool`, default `True`): Whether to copy the input before mutating it.
+            Callers that own `message_list` (and hold no other references to its
+            element dicts) can pass `False` to skip the copy entirely.
+        image_store (`dict[int, Any]`, *optional*): Out-of-band store produced by
+            `tools.utils.pack_images`; image elements carrying a `handle` are
+            resolved against it, keeping the payload out of every copy layer.
+    """
+    # Normalize the conversion map to plain string keys/values once, so the
+    # per-message probe below is a single C-level dict get instead of hashing
+    # through enum machinery for every entry.
+    if role_conversions and not all(
+        type(key) is str and type(value) is str
+        for key, value in role_conversions.items()
+    ):
+        role_conversions = {
+            getattr(key, "value", key): getattr(value, "value", value)
+            for key, value in role_conversions.items()
+        }
+    output_message_list = []
+    # The converted role and tail content live in locals, so the merge pass
+    # below does no per-message dict mutation or tail re-indexing. Output
+    # dicts are built fresh; caller-owned message dicts are never touched,
+    # and with `copy=True` only image-bearing content lists are copied.
+    last_role = None
+    last_content = None
+    for message in message_list:
+        role = message["role"]
+        if role not in _VALID_ROLES:
+            raise ValueError(
+                f"Incorrect role {role}, only {sorted(_VALID_ROLES)} are supported for now."
+            )
+
+        role = role_conversions.get(role, role)
+        # encode images if needed
+        content = message["content"]
+        if isinstance(content, list) and any(
+            element.get("type") == "image" for element in content
+        ):
+            if copy:
+                content = [dict(element) for element in content]
+            for element in content:
+                if element["type"] == "image":
+                    assert (
+                        not flatten_messages_as_text
+                    ), f"Cannot use images with {flatten_messages_as_text=}"
+                    if "handle" in element:
+                        if image_store is None:
+                            raise ValueError(
+                                "Message contains a packed image handle but no "
+                                "image_store was supplied; pass the store "
+                                "returned by `pack_images` alongside the messages."
+                            )
+                        image = image_store[element.pop("handle")]
+                    else:
+                        image = element.pop("image")
+                    if convert_images_to_image_urls:
+                        element.update(
+                            {
+                                "type": "image_url",
+                                "image_url": {"url": encode_image_data_url(image)},
+                            }
+                        )
+                    else:
+                        element["image"] = encode_image_base64(image)
+
+        if last_role == role:
+            assert isinstance(content, list), "Error: wrong content:" + str(content)
+            if flatten_messages_as_text:
+                # Collect fragments and join once after the loop: += on str
+                # re-copies the accumulated text for every merged message.
+                last_content.append(content[0]["text"])
+            elif copy:
+                # The tail may still alias a caller-owned content list, so
+                # concatenate into a fresh one instead of extending in place.
+                last_content = last_content + content
+                output_message_list[-1]["content"] = last_content
+            else:
+                last_content += content
+        else:
+            if flatten_messages_as_text:
+                last_content = [content[0]["text"]]
+            else:
+                last_content = content
+            last_role = role
+            output_message_list.append({"role": role, "content": last_content})
+    if flatten_messages_as_text:
+        for message in output_message_list:
+            message["content"] = "".join(message["content"])
+    return output_message_list
+
+
+def _chat_template_cache_key(messages, tools) -> Optional[tuple]:
+    """Build a hashable fingerprint of a chat-template render, or None.
+
+    Returns None when the messages cannot be fingerprinted cheaply (e.g. image
+    content), in which case callers must render uncached.
+    """
+    try:
+        tools_key = (
+            tuple(_json_dumps(tool) for tool in tools) if tools else None
+        )
+        parts = []
+        for message in messages:
+            content = message["content"]
+            if not isinstance(content, str):
+                fragments = []
+                for element in content:
+                    if element.get("type") != "text":
+                        return None
+                    fragments.append(element.get("text", ""))
+                content = tuple(fragments)
+            parts.append((message["role"], content))
+        return (tuple(parts), tools_key)
+    except (TypeError, KeyError):
+        return None
+
+
+class Model:
+    # Instances carry a fixed attribute set; slots drop the per-instance
+    # __dict__, which adds up when an orchestrator spawns one model per agent.
+    # Local-inference subclasses that hold arbitrary backend state simply omit
+    # __slots__ and get a __dict__ back.
+    __slots__ = (
+        "flatten_messages_as_text",
+        "tool_name_key",
+        "tool_arguments_key",
+        "kwargs",
+        "last_input_token_count",
+        "last_output_token_count",
+        "_chat_template_cache",
+    )
+
+    # Optional attributes exported by `to_dict` when a subclass defines them.
+    _EXPORT_ATTRIBUTES = (
+        "custom_role_conversion",
+        "temperature",
+        "top_p",
+        "max_tokens",
+        "provider",
+        "timeout",
+        "api_base",
+        "torch_dtype",
+        "device_map",
+        "organization",
+        "project",
+        "azure_endpoint",
+    )
+    _DANGEROUS_ATTRIBUTES = ("token", "api_key")
+
+    def __init__(
+        self,
+        flatten_messages_as_text: bool = False,
+        tool_name_key: str = "name",
+        tool_arguments_key: str = "arguments",
+        **kwargs,
+    ):
+        self.flatten_messages_as_text = flatten_messages_as_text
+        self.tool_name_key = tool_name_key
+        self.tool_arguments_key = tool_arguments_key
+        self.kwargs = kwargs
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+        self._chat_template_cache = {}
+
+    def _prepare_completion_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        custom_role_conversions: Optional[Dict[str, str]] = None,
+        convert_images_to_image_urls: bool = False,
+        copy_messages: bool = True,
+        image_store: Optional[Dict[int, Any]] = None,
+        **kwargs,
+    ) -> Dict:
+        """
+        Prepare parameters required for model invocation, handling parameter priorities.
+
+        Parameter priority from high to low:
+        1. Explicitly passed kwargs
+        2. Specific parameters (stop_sequences, grammar, etc.)
+        3. Default values in self.kwargs
+
+        Callers owning `messages` outright can pass `copy_messages=False` to
+        let the cleaning pass mutate it in place and skip the copy. Messages
+        processed by `tools.utils.pack_images` must be accompanied by their
+        `image_store` so handles can be resolved during cleaning.
+        """
+        # Clean and standardize the message list
+        messages = get_clean_message_list(
+            messages,
+            role_conversions=custom_role_conversions or tool_role_conversions,
+            convert_images_to_image_urls=convert_images_to_image_urls,
+            flatten_messages_as_text=self.flatten_messages_as_text,
+            copy=copy_messages,
+            image_store=image_store,
+        )
+
+        # dict.copy() is a C-level clone, cheaper than {**self.kwargs, ...}
+        # unpacking; then layer specific parameters and caller kwargs on top.
+        completion_kwargs = self.kwargs.copy()
+        completion_kwargs["messages"] = messages
+        if stop_sequences is not None:
+            completion_kwargs["stop"] = stop_sequences
+        if grammar is not None:
+            completion_kwargs["grammar"] = grammar
+        completion_kwargs.update(kwargs)
+        return completion_kwargs
+
+    def _apply_chat_template_cached(self, render, messages, tools):
+        """Memoize a chat-template render keyed on the message fingerprint.
+
+        Jinja rendering plus tokenization is pure Python and identical across
+        retries and unchanged turns; unfingerprintable inputs (images,
+        non-standard content) fall back to calling `render` directly.
+        """
+        key = _chat_template_cache_key(messages, tools)
+        if key is None:
+            return render()
+        cache = self._chat_template_cache
+        if key in cache:
+            return cache[key]
+        rendered = render()
+        if len(cache) >= 16:
+            cache.clear()
+        cache[key] = rendered
+        return rendered
+
+    def get_token_counts(self) -> Dict[str, int]:
+        return {
+            "input_token_count": self.last_input_token_count,
+            "output_token_count": self.last_output_token_count,
+        }
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        """Process the input messages and return the model's response.
+
+        Parameters:
+            messages (`List[Dict[str, str]]`):
+                A list of message dictionaries to be processed. Each dictionary should have the structure `{"role": "user/system", "content": "message content"}`.
+            stop_sequences (`List[str]`, *optional*):
+                A list of strings that will stop the generation if encountered in the model's output.
+            grammar (`str`, *optional*):
+                The grammar or formatting structure to use in the model's response.
+            **kwargs:
+                Additional keyword arguments to be passed to the underlying model.
+
+        Returns:
+            `ChatMessage`: A chat message object containing the model's response.
+        """
+        pass  # To be implemented in child classes!
+
+    def to_dict(self) -> Dict:
+        """
+        Converts the model into a JSON-compatible dictionary.
+        """
+        model_dictionary = {
+            **self.kwargs,
+            "last_input_token_count": self.last_input_token_count,
+            "last_output_token_count": self.last_output_token_count,
+            "model_id": self.model_id,
+        }
+        # Resolve the hasattr scan once per subclass: model attributes are set
+        # uniformly in __init__, so the applicable subset never changes.
+        cls = type(self)
+        export_attributes = cls.__dict__.get("_resolved_export_attributes")
+        if export_attributes is None:
+            export_attributes = tuple(
+                attribute for attribute in self._EXPORT_ATTRIBUTES if hasattr(self, attribute)
+            )
+            cls._resolved_export_attributes = export_attributes
+        for attribute in export_attributes:
+            model_dictionary[attribute] = getattr(self, attribute)
+
+        dangerous_attributes = cls.__dict__.get("_resolved_dangerous_attributes")
+        if dangerous_attributes is None:
+            dangerous_attributes = tuple(
+                attribute for attribute in self._DANGEROUS_ATTRIBUTES if hasattr(self, attribute)
+            )
+            cls._resolved_dangerous_attributes = dangerous_attributes
+        for attribute_name in dangerous_attributes:
+            print(
+                f"For security reasons, we do not export the `{attribute_name}` attribute of your model. Please export it manually."
+            )
+        return model_dictionary
+
+    @classmethod
+    def from_dict(cls, model_dictionary: Dict[str, Any]) -> "Model":
+        model_instance = cls(
+            **{
+                k: v
+                for k, v in model_dictionary.items()
+                if k not in ["last_input_token_count", "last_output_token_count"]
+            }
+        )
+        model_instance.last_input_token_count = model_dictionary.pop(
+            "last_input_token_count", None
+        )
+        model_instance.last_output_token_count = model_dictionary.pop(
+            "last_output_token_count", None
+        )
+        return model_instance
+
+
+class VLLMModel(Model):
+    """Model to use [vLLM](https://docs.vllm.ai/) for fast LLM inference and serving.
+
+    Parameters:
+        model_id (`str`):
+            The Hugging Face model ID to be used for inference.
+            This can be a path or model identifier from the Hugging Face model hub.
+    """
+
+    def __init__(self, model_id, **kwargs):
+        if not _is_package_available("vllm"):
+            raise ModuleNotFoundError(
+                "Please install 'vllm' extra to use VLLMModel: `pip install 'smolagents[vllm]'`"
+            )
+
+        from vllm import LLM, SamplingParams
+        from vllm.transformers_utils.tokenizer import get_tokenizer
+
+        super().__init__(**kwargs)
+
+        self.model_id = model_id
+        self.model = LLM(model=model_id)
+        self.tokenizer = get_tokenizer(model_id)
+        # Resolved once here so the per-call path skips the import machinery.
+        self._sampling_params_cls = SamplingParams
+        self._is_vlm = False  # VLLMModel does not support vision models yet.
+
+    def cleanup(self):
+        import gc
+
+        import torch
+        from vllm.distributed.parallel_state import (
+            destroy_distributed_environment,
+            destroy_model_parallel,
+        )
+
+        destroy_model_parallel()
+        if self.model is not None:
+            # taken from https://github.com/vllm-project/vllm/issues/1908#issuecomment-2076870351
+            del self.model.llm_engine.model_executor.driver_worker
+        self.model = None
+        gc.collect()
+        destroy_distributed_environment()
+        torch.cuda.empty_cache()
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        return self.batch(
+            [messages], stop_sequences=stop_sequences, grammar=grammar, **kwargs
+        )[0]
+
+    def batch(
+        self,
+        list_of_messages: List[List[Dict[str, str]]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> List[ChatMessage]:
+        """Generate one completion per message list in a single vLLM pass.
+
+        Submitting all prompts through one `generate` call lets vLLM's
+        continuous batching overlap prefill and decode, instead of paying full
+        scheduler setup per prompt.
+        """
+        prompts = []
+        prepared_stop_sequences = []
+        completion_kwargs = {}
+        for messages in list_of_messages:
+            completion_kwargs = self._prepare_completion_kwargs(
+                messages=messages,
+                flatten_messages_as_text=(not self._is_vlm),
+                stop_sequences=stop_sequences,
+                grammar=grammar,
+                **kwargs,
+            )
+            messages = completion_kwargs.pop("messages")
+            prepared_stop_sequences = completion_kwargs.pop("stop", [])
+            tools = completion_kwargs.pop("tools", None)
+            completion_kwargs.pop("tool_choice", None)
+
+            prompts.append(
+                self._apply_chat_template_cached(
+                    lambda: self.tokenizer.apply_chat_template(
+                        messages,
+                        tools=tools,
+                        add_generation_prompt=True,
+                        tokenize=False,
+                    ),
+                    messages,
+                    tools,
+                )
+            )
+
+        sampling_params = self._sampling_params_cls(
+            n=kwargs.get("n", 1),
+            temperature=kwargs.get("temperature", 0.0),
+            top_p=kwargs.get("top_p", 1.0),
+            top_k=kwargs.get("top_k", 1.0),
+            max_tokens=kwargs.get("max_tokens", 8192),
+            stop=prepared_stop_sequences,
+        )
+
+        outs = self.model.generate(
+            prompts,
+            sampling_params=sampling_params,
+        )
+        self.last_input_token_count = sum(len(out.prompt_token_ids) for out in outs)
+        self.last_output_token_count = sum(
+            len(out.outputs[0].token_ids) for out in outs
+        )
+        return [
+            ChatMessage(
+                role=MessageRole.ASSISTANT,
+                content=out.outputs[0].text,
+                raw={
+                    "out": out.outputs[0].text,
+                    "completion_kwargs": completion_kwargs,
+                },
+            )
+            for out in outs
+        ]
+
+
+class MLXModel(Model):
+    """A class to interact with models loaded using MLX on Apple silicon.
+
+    > [!TIP]
+    > You must have `mlx-lm` installed on your machine. Please run `pip install smolagents[mlx-lm]` if it's not the case.
+
+    Parameters:
+        model_id (str):
+            The Hugging Face model ID to be used for inference. This can be a path or model identifier from the Hugging Face model hub.
+        tool_name_key (str):
+            The key, which can usually be found in the model's chat template, for retrieving a tool name.
+        tool_arguments_key (str):
+            The key, which can usually be found in the model's chat template, for retrieving tool arguments.
+        trust_remote_code (bool):
+            Some models on the Hub require running remote code: for this model, you would have to set this flag to True.
+        kwargs (dict, *optional*):
+            Any additional keyword arguments that you want to use in model.generate(), for instance `max_tokens`.
+
+    Example:
+    ```python
+    >>> engine = MLXModel(
+    ...     model_id="mlx-community/Qwen2.5-Coder-32B-Instruct-4bit",
+    ...     max_tokens=10000,
+    ... )
+    >>> messages = [
+    ...     {
+    ...         "role": "user",
+    ...         "content": [
+    ...             {"type": "text", "text": "Explain quantum mechanics in simple terms."}
+    ...         ]
+    ...     }
+    ... ]
+    >>> response = engine(messages, stop_sequences=["END"])
+    >>> print(response)
+    "Quantum mechanics is the branch of physics that studies..."
+    ```
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        tool_name_key: str = "name",
+        tool_arguments_key: str = "arguments",
+        trust_remote_code: bool = False,
+        **kwargs,
+    ):
+        super().__init__(
+            flatten_messages_as_text=True, **kwargs
+        )  # mlx-lm doesn't support vision models
+        if not _is_package_available("mlx_lm"):
+            raise ModuleNotFoundError(
+                "Please install 'mlx-lm' extra to use 'MLXModel': `pip install 'smolagents[mlx-lm]'`"
+            )
+        import mlx_lm
+
+        self.model_id = model_id
+        self.model, self.tokenizer = mlx_lm.load(
+            model_id, tokenizer_config={"trust_remote_code": trust_remote_code}
+        )
+        self.stream_generate = mlx_lm.stream_generate
+        self.tool_name_key = tool_name_key
+        self.tool_arguments_key = tool_arguments_key
+        self.is_vlm = False  # mlx-lm doesn't support vision models
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **kwargs,
+        )
+        messages = completion_kwargs.pop("messages")
+        prepared_stop_sequences = completion_kwargs.pop("stop", [])
+        tools = completion_kwargs.pop("tools", None)
+        completion_kwargs.pop("tool_choice", None)
+
+        prompt_ids = self._apply_chat_template_cached(
+            lambda: self.tokenizer.apply_chat_template(
+                messages,
+                tools=tools,
+                add_generation_prompt=True,
+            ),
+            messages,
+            tools,
+        )
+
+        self.last_input_token_count = len(prompt_ids)
+        self.last_output_token_count = 0
+        # Accumulate chunks in a list and join once at the end: += on str
+        # re-copies the whole output for every streamed token. Stop sequences
+        # are matched against a rolling tail — a hit can only end inside the
+        # newly streamed chunk, so the chunk plus the longest possible overlap
+        # with the previous tail is all that ever needs scanning.
+        max_stop_len = max((len(s) for s in prepared_stop_sequences), default=0)
+        chunks = []
+        total_len = 0
+        tail = ""
+        found_stop_sequence = False
+        stop_cut = 0
+
+        for _ in self.stream_generate(
+            self.model, self.tokenizer, prompt=prompt_ids, **completion_kwargs
+        ):
+            self.last_output_token_count += 1
+            chunk = _.text
+            chunks.append(chunk)
+            total_len += len(chunk)
+            if not prepared_stop_sequences:
+                continue
+            window = tail + chunk
+            for stop_sequence in prepared_stop_sequences:
+                stop_sequence_start = window.find(stop_sequence)
+                if stop_sequence_start != -1:
+                    stop_cut = total_len - len(window) + stop_sequence_start
+                    found_stop_sequence = True
+                    break
+            if found_stop_sequence:
+                break
+            tail = window[max(len(window) - max_stop_len + 1, 0) :]
+
+        text = "".join(chunks)
+        if found_stop_sequence:
+            text = text[:stop_cut]
+
+        chat_message = ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=text,
+            raw={"out": text, "completion_kwargs": completion_kwargs},
+        )
+        return chat_message
+
+
+_StopOnStrings = None
+
+
+def _get_stop_on_strings_class():
+    # transformers is an optional dependency, so the StoppingCriteria subclass
+    # cannot be defined at import time; it is built once on first use and
+    # reused for every subsequent call instead of being redefined per request.
+    global _StopOnStrings
+    if _StopOnStrings is None:
+        from transformers import StoppingCriteria
+
+        class StopOnStrings(StoppingCriteria):
+            def __init__(self, stop_strings: List[str], tokenizer):
+                self.stop_strings = stop_strings
+                self.tokenizer = tokenizer
+                # Pre-tokenize the stop sequences once: matching the tail of
+                # `input_ids` against these tuples is a handful of integer
+                # comparisons per step instead of a detokenizer round-trip for
+                # every generated token.
+                try:
+                    stop_ids = [
+                        tuple(tokenizer.encode(stop_string, add_special_tokens=False))
+                        for stop_string in stop_strings
+                    ]
+                except (AttributeError, TypeError):
+                    stop_ids = []
+                self.stop_ids = [ids for ids in stop_ids if ids]
+                self.max_stop_id_len = max(
+                    (len(ids) for ids in self.stop_ids), default=0
+                )
+                # Decoded-text fallback state, only exercised when none of the
+                # stop strings survived pre-tokenization. Bounded so it cannot
+                # grow with the generation length.
+                self.max_stream_len = 2 * max(
+                    (len(stop_string) for stop_string in stop_strings), default=1
+                )
+                self.stream = ""
+
+            def reset(self):
+                self.stream = ""
+
+            def __call__(self, input_ids, scores, **kwargs):
+                if self.stop_ids:
+                    tail = input_ids[0][-self.max_stop_id_len :].tolist()
+                    return any(
+                        tuple(tail[-len(stop_ids) :]) == stop_ids
+                        for stop_ids in self.stop_ids
+                    )
+                generated = self.tokenizer.decode(
+                    input_ids[0][-1], skip_special_tokens=True
+                )
+                self.stream = (self.stream + generated)[-self.max_stream_len :]
+                return any(
+                    self.stream.endswith(stop_string)
+                    for stop_string in self.stop_strings
+                )
+
+        _StopOnStrings = StopOnStrings
+    return _StopOnStrings
+
+
+class TransformersModel(Model):
+    """A class that uses Hugging Face's Transformers library for language model interaction.
+
+    This model allows you to load and use Hugging Face's models locally using the Transformers library. It supports features like stop sequences and grammar customization.
+
+    > [!TIP]
+    > You must have `transformers` and `torch` installed on your machine. Please run `pip install smolagents[transformers]` if it's not the case.
+
+    Parameters:
+        model_id (`str`):
+            The Hugging Face model ID to be used for inference. This can be a path or model identifier from the Hugging Face model hub.
+            For example, `"Qwen/Qwen2.5-Coder-32B-Instruct"`.
+        device_map (`str`, *optional*):
+            The device_map to initialize your model with.
+        torch_dtype (`str`, *optional*):
+            The torch_dtype to initialize your model with.
+        trust_remote_code (bool, default `False`):
+            Some models on the Hub require running remote code: for this model, you would have to set this flag to True.
+        kwargs (dict, *optional*):
+            Any additional keyword arguments that you want to use in model.generate(), for instance `max_new_tokens` or `device`.
+        **kwargs:
+            Additional keyword arguments to pass to `model.generate()`, for instance `max_new_tokens` or `device`.
+    Raises:
+        ValueError:
+            If the model name is not provided.
+
+    Example:
+    ```python
+    >>> engine = TransformersModel(
+    ...     model_id="Qwen/Qwen2.5-Coder-32B-Instruct",
+    ...     device="cuda",
+    ...     max_new_tokens=5000,
+    ... )
+    >>> messages = [{"role": "user", "content": "Explain quantum mechanics in simple terms."}]
+    >>> response = engine(messages, stop_sequences=["END"])
+    >>> print(response)
+    "Quantum mechanics is the branch of physics that studies..."
+    ```
+    """
+
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        device_map: Optional[str] = None,
+        torch_dtype: Optional[str] = None,
+        trust_remote_code: bool = False,
+        torch_compile: bool = False,
+        **kwargs,
+    ):
+        if not is_torch_available() or not _is_package_available("transformers"):
+            raise ModuleNotFoundError(
+                "Please install 'transformers' extra to use 'TransformersModel': `pip install 'smolagents[transformers]'`"
+            )
+        import torch
+        from transformers import (
+            AutoModelForCausalLM,
+            AutoModelForImageTextToText,
+            AutoProcessor,
+            AutoTokenizer,
+            StoppingCriteriaList,
+        )
+
+        # Resolved once here so make_stopping_criteria skips the import
+        # machinery on every call.
+        self._stopping_criteria_list_cls = StoppingCriteriaList
+
+        if not model_id:
+            warnings.warn(
+                "The 'model_id' parameter will be required in version 2.0.0. "
+                "Please update your code to pass this parameter to avoid future errors. "
+                "For now, it defaults to 'HuggingFaceTB/SmolLM2-1.7B-Instruct'.",
+                FutureWarning,
+            )
+            model_id = "HuggingFaceTB/SmolLM2-1.7B-Instruct"
+        self.model_id = model_id
+
+        default_max_tokens = 5000
+        max_new_tokens = kwargs.get("max_new_tokens") or kwargs.get("max_tokens")
+        if not max_new_tokens:
+            kwargs["max_new_tokens"] = default_max_tokens
+            logger.warning(
+                f"`max_new_tokens` not provided, using this default value for `max_new_tokens`: {default_max_tokens}"
+            )
+
+        if device_map is None:
+            device_map = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Using device: {device_map}")
+        self._is_vlm = False
+        try:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                device_map=device_map,
+                torch_dtype=torch_dtype,
+                trust_remote_code=trust_remote_code,
+            )
+            self.tokenizer = AutoTokenizer.from_pretrained(model_id, use_fast=True)
+        except ValueError as e:
+            if "Unrecognized configuration class" in str(e):
+                self.model = AutoModelForImageTextToText.from_pretrained(
+                    model_id,
+                    device_map=device_map,
+                    torch_dtype=torch_dtype,
+                    trust_remote_code=trust_remote_code,
+                )
+                self.processor = AutoProcessor.from_pretrained(model_id)
+                self._is_vlm = True
+            else:
+                raise e
+        except Exception as e:
+            raise ValueError(
+                f"Failed to load tokenizer and model for {model_id=}: {e}"
+            ) from e
+        self.model.eval()
+        if torch_compile:
+            # Opt-in: compilation pays off on decode-heavy workloads but adds
+            # significant warm-up latency to the first calls.
+            self.model = torch.compile(
+                self.model, mode="reduce-overhead", fullgraph=False
+            )
+        self._stop_criteria_cache = {}
+        super().__init__(flatten_messages_as_text=not self._is_vlm, **kwargs)
+
+    def make_stopping_criteria(
+        self, stop_sequences: List[str], tokenizer
+    ) -> "StoppingCriteriaList":
+        # Agent loops pass the same stop sequences on every step, so the
+        # compiled criteria (including pre-tokenized stop ids) are reused
+        # instead of being rebuilt per call.
+        key = frozenset(stop_sequences)
+        stopping_criteria = self._stop_criteria_cache.get(key)
+        if stopping_criteria is None:
+            stop_on_strings = _get_stop_on_strings_class()
+            stopping_criteria = self._stopping_criteria_list_cls(
+                [stop_on_strings(stop_sequences, tokenizer)]
+            )
+            self._stop_criteria_cache[key] = stopping_criteria
+        else:
+            for criterion in stopping_criteria:
+                criterion.reset()
+        return stopping_criteria
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **kwargs,
+        )
+
+        messages = completion_kwargs.pop("messages")
+        stop_sequences = completion_kwargs.pop("stop", None)
+
+        max_new_tokens = (
+            kwargs.get("max_new_tokens")
+            or kwargs.get("max_tokens")
+            or self.kwargs.get("max_new_tokens")
+            or self.kwargs.get("max_tokens")
+        )
+
+        if max_new_tokens:
+            completion_kwargs["max_new_tokens"] = max_new_tokens
+
+        import torch
+
+        if hasattr(self, "processor"):
+            # VLM inputs carry images, which the fingerprint helper rejects,
+            # so this path effectively stays uncached.
+            prompt_tensor = self._apply_chat_template_cached(
+                lambda: self.processor.apply_chat_template(
+                    messages,
+                    return_tensors="pt",
+                    tokenize=True,
+                    return_dict=True,
+                    add_generation_prompt=True,
+                ),
+                messages,
+                None,
+            )
+            prompt_tensor = prompt_tensor.to(self.model.device)
+        else:
+            # Tokenize to numpy and convert with as_tensor: the "pt" path
+            # builds an intermediate CPU tensor from Python lists before the
+            # device move, which as_tensor over the numpy array skips.
+            encoded = self._apply_chat_template_cached(
+                lambda: self.tokenizer.apply_chat_template(
+                    messages,
+                    return_tensors="np",
+                    return_dict=True,
+                    add_generation_prompt=True,
+                ),
+                messages,
+                None,
+            )
+            prompt_tensor = {
+                key: torch.as_tensor(value, device=self.model.device)
+                for key, value in encoded.items()
+            }
+        count_prompt_tokens = prompt_tensor["input_ids"].shape[1]
+
+        if stop_sequences:
+            stopping_criteria = self.make_stopping_criteria(
+                stop_sequences,
+                tokenizer=(
+                    self.processor if hasattr(self, "processor") else self.tokenizer
+                ),
+            )
+        else:
+            stopping_criteria = None
+
+        # inference_mode skips autograd bookkeeping entirely; generation never
+        # needs gradients.
+        with torch.inference_mode():
+            out = self.model.generate(
+                **prompt_tensor,
+                stopping_criteria=stopping_criteria,
+                **completion_kwargs,
+            )
+        generated_tokens = out[0, count_prompt_tokens:]
+        if hasattr(self, "processor"):
+            output_text = self.processor.decode(
+                generated_tokens, skip_special_tokens=True
+            )
+        else:
+            output_text = self.tokenizer.decode(
+                generated_tokens, skip_special_tokens=True
+            )
+        self.last_input_token_count = count_prompt_tokens
+        self.last_output_token_count = len(generated_tokens)
+
+        if stop_sequences is not None:
+            output_text = remove_stop_sequences(output_text, stop_sequences)
+
+        chat_message = ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=output_text,
+            raw={"out": output_text, "completion_kwargs": completion_kwargs},
+        )
+        return chat_message
+
+
+class ApiModel(Model):
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+    def postprocess_message(
+        self, message: ChatMessage
+    ) -> ChatMessage:
+        """Sometimes APIs fail to properly parse a tool call: this function tries to parse."""
+        message.role = MessageRole.ASSISTANT  # Overwrite role if needed
+        # tool_calls is None for messages without the field (e.g. litellm
+        # plain-content completions); normalize so the loop is a no-op.
+        for tool_call in message.tool_calls or ():
+            arguments = tool_call.function.arguments
+            # Arguments already parsed by the API are passed through untouched
+            if isinstance(arguments, str):
+                tool_call.function.arguments = parse_json_if_needed(arguments)
+        return message
+
+    def _set_token_counts(self, usage) -> None:
+        """Record prompt/completion token counts from a usage object.
+
+        Reads the instance dict once instead of going through the SDK's
+        attribute descriptors twice; falls back to plain attribute access for
+        usage objects without a `__dict__` (e.g. named tuples).
+        """
+        data = getattr(usage, "__dict__", None)
+        if data is not None and "prompt_tokens" in data:
+            self.last_input_token_count = data["prompt_tokens"]
+            self.last_output_token_count = data["completion_tokens"]
+        else:
+            self.last_input_token_count = usage.prompt_tokens
+            self.last_output_token_count = usage.completion_tokens
+
+
+# Provider families whose litellm backends only accept flat text messages.
+_FLATTEN_PREFIXES = ("ollama", "groq", "cerebras")
+
+
+@lru_cache(maxsize=128)
+def _provider_family(model_id: str) -> str:
+    """Return the interned provider-family prefix of `model_id`, or ''."""
+    for prefix in _FLATTEN_PREFIXES:
+        if model_id.startswith(prefix):
+            return sys.intern(prefix)
+    return ""
+
+
+_litellm = None
+
+
+def _get_litellm():
+    # litellm is optional and slow to import; resolve it once and serve every
+    # subsequent call from the module-level reference instead of re-probing
+    # sys.modules per request.
+    global _litellm
+    if _litellm is None:
+        try:
+            import litellm
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError(
+                "Please install 'litellm' extra to use LiteLLMModel: `pip install 'smolagents[litellm]'`"
+            )
+        _litellm = litellm
+    return _litellm
+
+
+class LiteLLMModel(ApiModel):
+    """Model to use [LiteLLM Python SDK](https://docs.litellm.ai/docs/#litellm-python-sdk) to access hundreds of LLMs.
+
+    Parameters:
+        model_id (`str`):
+            The model identifier to use on the server (e.g. "robobrain").
+        api_base (`str`, *optional*):
+            The base URL of the provider API to call the model.
+        api_key (`str`, *optional*):
+            The API key to use for authentication.
+        custom_role_conversions (`dict[str, str]`, *optional*):
+            Custom role conversion mapping to convert message roles in others.
+            Useful for specific models that do not support specific message roles like "system".
+        flatten_messages_as_text (`bool`, *optional*): Whether to flatten messages as text.
+            Defaults to `True` for models that start with "ollama", "groq", "cerebras".
+        **kwargs:
+            Additional keyword arguments to pass to the OpenAI API.
+    """
+
+    __slots__ = (
+        "model_id",
+        "api_base",
+        "api_key",
+        "custom_role_conversions",
+        "_static_request_kwargs",
+    )
+
+    def __init__(
+        self,
+        model_id: Optional[str] = None,
+        api_base=None,
+        api_key=None,
+        custom_role_conversions: Optional[Dict[str, str]] = None,
+        flatten_messages_as_text: Optional[bool] = None,
+        **kwargs,
+    ):
+        if not model_id:
+            warnings.warn(
+                "The 'model_id' parameter will be required in version 2.0.0. "
+                "Please update your code to pass this parameter to avoid future errors. "
+                "For now, it defaults to 'anthropic/claude-3-5-sonnet-20240620'.",
+                FutureWarning,
+            )
+            model_id = "anthropic/claude-3-5-sonnet-20240620"
+        self.model_id = model_id
+        self.api_base = api_base
+        self.api_key = api_key
+        self.custom_role_conversions = custom_role_conversions
+        flatten_messages_as_text = (
+            flatten_messages_as_text
+            if flatten_messages_as_text is not None
+            else _provider_family(self.model_id) != ""
+        )
+        super().__init__(flatten_messages_as_text=flatten_messages_as_text, **kwargs)
+        # Constant per-request arguments, assembled once instead of per call.
+        self._static_request_kwargs = {
+            "model": model_id,
+            "api_base": api_base,
+            "api_key": api_key,
+            "convert_images_to_image_urls": True,
+            "custom_role_conversions": custom_role_conversions,
+        }
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        stream: bool = False,
+        **kwargs,
+    ) -> ChatMessage:
+        litellm = _get_litellm()
+
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+
+        if stream:
+            return self._stream_call(litellm, completion_kwargs)
+        response = litellm.completion(**completion_kwargs)
+        return self._process_response(response)
+
+    def _stream_call(self, litellm, completion_kwargs: Dict[str, Any]) -> ChatMessage:
+        """Assemble a completion from streamed deltas.
+
+        The server terminates the stream at the first stop sequence, so bytes
+        past the stop are never generated or transferred. Intended for
+        plain-text completions; tool-call deltas are not assembled here.
+        """
+        fragments = []
+        usage = None
+        for chunk in litellm.completion(
+            stream=True,
+            stream_options={"include_usage": True},
+            **completion_kwargs,
+        ):
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices:
+                delta = chunk.choices[0].delta
+                if delta is not None and delta.content:
+                    fragments.append(delta.content)
+        content = "".join(fragments)
+        if usage is not None:
+            self._set_token_counts(usage)
+        return ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=content,
+            raw={"out": content, "completion_kwargs": completion_kwargs},
+        )
+
+    def _process_response(self, response) -> ChatMessage:
+        self._set_token_counts(response.usage)
+        # litellm responses expose the OpenAI message shape, so the direct
+        # attribute reader skips the model_dump/from_dict round-trip here too.
+        first_message = ChatMessage.from_openai(response.choices[0].message, response)
+        return self.postprocess_message(first_message)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        """Async counterpart of `__call__`, awaiting the completion request."""
+        litellm = _get_litellm()
+
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        response = await litellm.acompletion(**completion_kwargs)
+        return self._process_response(response)
+
+    def batch(self, batches: List[Dict[str, Any]]) -> List[ChatMessage]:
+        """Run several completion requests concurrently.
+
+        Args:
+            batches (`list[dict]`): One kwargs dict per request, as accepted
+                by `acall` (at minimum a `messages` entry).
+
+        Returns:
+            `list[ChatMessage]`: Responses in the same order as `batches`.
+        Wall-clock drops from the sum of round-trips to the slowest one.
+        """
+
+        async def _gather():
+            return await asyncio.gather(*(self.acall(**batch) for batch in batches))
+
+        return asyncio.run(_gather())
+
+
+_HF_EXECUTOR = None
+
+
+def _get_hf_executor():
+    # Shared daemon pool for blocking Inference API fanout; sized for the
+    # concurrency the hosted providers accept.
+    global _HF_EXECUTOR
+    if _HF_EXECUTOR is None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        _HF_EXECUTOR = ThreadPoolExecutor(max_workers=64, thread_name_prefix="hf-api")
+    return _HF_EXECUTOR
+
+
+class HfApiModel(ApiModel):
+    """A class to interact with Hugging Face's Inference API for language model interaction.
+
+    This model allows you to communicate with Hugging Face's models using the Inference API. It can be used in both serverless mode or with a dedicated endpoint, supporting features like stop sequences and grammar customization.
+
+    Parameters:
+        model_id (`str`, *optional*, default `"Qwen/Qwen2.5-Coder-32B-Instruct"`):
+            The Hugging Face model ID to be used for inference.
+            This can be a model identifier from the Hugging Face model hub or a URL to a deployed Inference Endpoint.
+            Currently, it defaults to `"Qwen/Qwen2.5-Coder-32B-Instruct"`, but this may change in the future.
+        provider (`str`, *optional*):
+            Name of the provider to use for inference. Can be `"replicate"`, `"together"`, `"fal-ai"`, `"sambanova"` or `"hf-inference"`.
+            defaults to hf-inference (HF Inference API).
+        token (`str`, *optional*):
+            Token used by the Hugging Face API for authentication. This token need to be authorized 'Make calls to the serverless Inference API'.
+            If the model is gated (like Llama-3 models), the token also needs 'Read access to contents of all public gated repos you can access'.
+            If not provided, the class will try to use environment variable 'HF_TOKEN', else use the token stored in the Hugging Face CLI configuration.
+        timeout (`int`, *optional*, defaults to 120):
+            Timeout for the API request, in seconds.
+        custom_role_conversions (`dict[str, str]`, *optional*):
+            Custom role conversion mapping to convert message roles in others.
+            Useful for specific models that do not support specific message roles like "system".
+        **kwargs:
+            Additional keyword arguments to pass to the Hugging Face API.
+
+    Raises:
+        ValueError:
+            If the model name is not provided.
+
+    Example:
+    ```python
+    >>> engine = HfApiModel(
+    ...     model_id="Qwen/Qwen2.5-Coder-32B-Instruct",
+    ...     token="your_hf_token_here",
+    ...     max_tokens=5000,
+    ... )
+    >>> messages = [{"role": "user", "content": "Explain quantum mechanics in simple terms."}]
+    >>> response = engine(messages, stop_sequences=["END"])
+    >>> print(response)
+    "Quantum mechanics is the branch of physics that studies..."
+    ```
+    """
+
+    __slots__ = (
+        "model_id",
+        "provider",
+        "custom_role_conversions",
+        "client",
+        "_client_init_kwargs",
+        "_async_client",
+        "_static_request_kwargs",
+    )
+
+    def __init__(
+        self,
+        model_id: str = "Qwen/Qwen2.5-Coder-32B-Instruct",
+        provider: Optional[str] = None,
+        token: Optional[str] = None,
+        timeout: Optional[int] = 120,
+        custom_role_conversions: Optional[Dict[str, str]] = None,
+        warmup: bool = False,
+        **kwargs,
+    ):
+        from huggingface_hub import InferenceClient
+
+        super().__init__(**kwargs)
+        self.model_id = model_id
+        self.provider = provider
+        if token is None:
+            token = os.getenv("HF_TOKEN")
+        self._client_init_kwargs = {
+            "model": self.model_id,
+            "provider": provider,
+            "token": token,
+            "timeout": timeout,
+        }
+        # Identical configurations share one client (and its warm connection
+        # pool) across instances, like the OpenAI-compatible models above.
+        self.client = _get_cached_client(InferenceClient, self._client_init_kwargs)
+        self._async_client = None
+        self.custom_role_conversions = custom_role_conversions
+        # Constant per-request arguments, assembled once instead of per call.
+        self._static_request_kwargs = {
+            "convert_images_to_image_urls": True,
+            "custom_role_conversions": custom_role_conversions,
+        }
+        if warmup:
+            threading.Thread(target=self._warmup, daemon=True).start()
+
+    def _warmup(self):
+        # Primes DNS, TCP and TLS in the background so the first completion
+        # skips the handshake latency.
+        try:
+            self.client.get_model_status(self.model_id)
+        except Exception:
+            pass
+
+    @property
+    def async_client(self):
+        # Created lazily: most deployments never touch the async path.
+        if self._async_client is None:
+            from huggingface_hub import AsyncInferenceClient
+
+            self._async_client = AsyncInferenceClient(**self._client_init_kwargs)
+        return self._async_client
+
+    def _process_response(self, response) -> ChatMessage:
+        self._set_token_counts(response.usage)
+        first_message = ChatMessage.from_hf_api(
+            response.choices[0].message, raw=response
+        )
+        return self.postprocess_message(first_message)
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        response = self.client.chat_completion(**completion_kwargs)
+        return self._process_response(response)
+
+    def map(
+        self, batch: List[List[Dict[str, str]]], **kwargs
+    ) -> List[ChatMessage]:
+        """Run one blocking completion per message list through a thread pool.
+
+        The GIL is released during the underlying network wait, so requests
+        overlap up to the provider's concurrency limit without callers having
+        to go async. Token counters reflect whichever request finished last.
+
+        Returns:
+            `list[ChatMessage]`: Responses in the same order as `batch`.
+        """
+        executor = _get_hf_executor()
+        futures = [
+            executor.submit(self.__call__, messages, **kwargs) for messages in batch
+        ]
+        return [future.result() for future in futures]
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        """Async counterpart of `__call__`, awaiting the completion request."""
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        response = await self.async_client.chat_completion(**completion_kwargs)
+        return self._process_response(response)
+
+    def batch(self, batches: List[Dict[str, Any]]) -> List[ChatMessage]:
+        """Run several completion requests concurrently.
+
+        Args:
+            batches (`list[dict]`): One kwargs dict per request, as accepted
+                by `acall` (at minimum a `messages` entry).
+
+        Returns:
+            `list[ChatMessage]`: Responses in the same order as `batches`.
+        Wall-clock drops from the sum of round-trips to the slowest one.
+        """
+
+        async def _gather():
+            return await asyncio.gather(*(self.acall(**batch) for batch in batches))
+
+        return asyncio.run(_gather())
+
+
+class OpenAIServerModel(ApiModel):
+    """This model connects to an OpenAI-compatible API server.
+
+    Parameters:
+        model_id (`str`):
+            The model identifier to use on the server (e.g. "robobrain").
+        api_base (`str`, *optional*):
+            The base URL of the OpenAI-compatible API server.
+        api_key (`str`, *optional*):
+            The API key to use for authentication.
+        organization (`str`, *optional*):
+            The organization to use for the API request.
+        project (`str`, *optional*):
+            The project to use for the API request.
+        client_kwargs (`dict[str, Any]`, *optional*):
+            Additional keyword arguments to pass to the OpenAI client (like organization, project, max_retries etc.).
+        custom_role_conversions (`dict[str, str]`, *optional*):
+            Custom role conversion mapping to convert message roles in others.
+            Useful for specific models that do not support specific message roles like "system".
+        flatten_messages_as_text (`bool`, default `False`):
+            Whether to flatten messages as text.
+        **kwargs:
+            Additional keyword arguments to pass to the OpenAI API.
+    """
+
+    __slots__ = (
+        "model_id",
+        "custom_role_conversions",
+        "client_kwargs",
+        "client",
+        "_async_client",
+        "_static_request_kwargs",
+    )
+
+    def __init__(
+        self,
+        model_id: str,
+        api_base: Optional[str] = None,
+        api_key: Optional[str] = None,
+        organization: Optional[str] = None,
+        project: Optional[str] = None,
+        client_kwargs: Optional[Dict[str, Any]] = None,
+        custom_role_conversions: Optional[Dict[str, str]] = None,
+        flatten_messages_as_text: bool = False,
+        warmup: bool = False,
+        **kwargs,
+    ):
+        if openai is None:
+            raise ModuleNotFoundError(
+                "Please install 'openai' extra to use OpenAIServerModel: `pip install 'smolagents[openai]'`"
+            )
+        super().__init__(flatten_messages_as_text=flatten_messages_as_text, **kwargs)
+        self.model_id = model_id
+        self.custom_role_conversions = custom_role_conversions
+        self.client_kwargs = client_kwargs or {}
+        self.client_kwargs.update(
+            {
+                "api_key": api_key,
+                "base_url": api_base,
+                "organization": organization,
+                "project": project,
+            }
+        )
+        self.client = self.create_client()
+        self._async_client = None
+        # Constant per-request arguments, assembled once instead of per call
+        # (same pattern as the master planner's completion kwargs).
+        self._static_request_kwargs = {
+            "model": model_id,
+            "custom_role_conversions": custom_role_conversions,
+            "convert_images_to_image_urls": True,
+            "tool_choice": "auto",
+        }
+        if warmup:
+            threading.Thread(target=self._warmup, daemon=True).start()
+
+    def _warmup(self):
+        # Primes DNS, TCP and TLS on the shared connection pool in the
+        # background so the first completion skips the handshake latency.
+        try:
+            self.client.models.list(timeout=2.0)
+        except Exception:
+            pass
+
+    def create_client(self):
+        return _get_cached_client(
+            openai.OpenAI, _with_shared_http_client(self.client_kwargs)
+        )
+
+    @property
+    def async_client(self):
+        # Created lazily: most deployments never touch the async path.
+        if self._async_client is None:
+            self._async_client = openai.AsyncOpenAI(**self.client_kwargs)
+        return self._async_client
+
+    def _process_response(self, response) -> ChatMessage:
+        self._set_token_counts(response.usage)
+        first_message = ChatMessage.from_openai(response.choices[0].message, response)
+        return self.postprocess_message(first_message)
+
+    async def acall(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> ChatMessage:
+        """Async counterpart of `__call__`, awaiting the completion request."""
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        response = await self.async_client.chat.completions.create(**completion_kwargs)
+        return self._process_response(response)
+
+    def batch(self, batches: List[Dict[str, Any]]) -> List[ChatMessage]:
+        """Run several completion requests concurrently.
+
+        Args:
+            batches (`list[dict]`): One kwargs dict per request, as accepted
+                by `acall` (at minimum a `messages` entry).
+
+        Returns:
+            `list[ChatMessage]`: Responses in the same order as `batches`.
+        Wall-clock drops from the sum of round-trips to the slowest one.
+        """
+
+        async def _gather():
+            return await asyncio.gather(*(self.acall(**batch) for batch in batches))
+
+        return asyncio.run(_gather())
+
+    def generate_n(
+        self,
+        messages: List[Dict[str, str]],
+        n: int,
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> List[ChatMessage]:
+        """Sample `n` completions for one prompt in a single request.
+
+        Server-side parallel sampling via the `n` parameter collapses k
+        round-trips into one; providers that reject `n > 1` can fall back to
+        `batch` with `n` copies of the same request.
+        """
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            n=n,
+            **kwargs,
+        )
+        response = self.client.chat.completions.create(**completion_kwargs)
+        self._set_token_counts(response.usage)
+        return [
+            self.postprocess_message(ChatMessage.from_openai(choice.message, response))
+            for choice in response.choices
+        ]
+
+    def _stream_call(self, completion_kwargs: Dict[str, Any]) -> ChatMessage:
+        """Assemble a completion from streamed deltas.
+
+        The server terminates the stream at the first stop sequence, so bytes
+        past the stop are never generated or transferred. Intended for
+        plain-text completions; tool-call deltas are not assembled here.
+        """
+        fragments = []
+        usage = None
+        for chunk in self.client.chat.completions.create(
+            stream=True,
+            stream_options={"include_usage": True},
+            **completion_kwargs,
+        ):
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if chunk.choices:
+                delta = chunk.choices[0].delta
+                if delta is not None and delta.content:
+                    fragments.append(delta.content)
+        content = "".join(fragments)
+        if usage is not None:
+            self._set_token_counts(usage)
+        return ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=content,
+            raw={"out": content, "completion_kwargs": completion_kwargs},
+        )
+
+    def stream_text(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        **kwargs,
+    ) -> Generator[str, None, None]:
+        """Yield the completion's text as it is generated.
+
+        Unlike `_stream_call`, which buffers the whole stream into one
+        ChatMessage, this hands each content delta to the caller immediately,
+        so the first token arrives after one network round-trip instead of
+        after the full generation. Token counters are updated from the final
+        usage chunk once the stream closes.
+        """
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        for chunk in self.client.chat.completions.create(
+            stream=True,
+            stream_options={"include_usage": True},
+            **completion_kwargs,
+        ):
+            if getattr(chunk, "usage", None) is not None:
+                self._set_token_counts(chunk.usage)
+            if chunk.choices:
+                delta = chunk.choices[0].delta
+                if delta is not None and delta.content:
+                    yield delta.content
+
+    def __call__(
+        self,
+        messages: List[Dict[str, str]],
+        stop_sequences: Optional[List[str]] = None,
+        grammar: Optional[str] = None,
+        stream: bool = False,
+        **kwargs,
+    ) -> ChatMessage:
+        completion_kwargs = self._prepare_completion_kwargs(
+            messages=messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            **self._static_request_kwargs,
+            **kwargs,
+        )
+        if stream:
+            return self._stream_call(completion_kwargs)
+        response = self.client.chat.completions.create(**completion_kwargs)
+        return self._process_response(response)
+
+
+class AzureOpenAIServerModel(OpenAIServerModel):
+    """This model connects to an Azure OpenAI deployment.
+
+    Parameters:
+        model_id (`str`):
+            The model deployment name to use when connecting (e.g. "robobrain").
+        azure_endpoint (`str`, *optional*):
+            The Azure endpoint, including the resource, e.g. `https://example-resource.azure.openai.com/`. If not provided, it will be inferred from the `AZURE_OPENAI_ENDPOINT` environment variable.
+        api_key (`str`, *optional*):
+            The API key to use for authentication. If not provided, it will be inferred from the `AZURE_OPENAI_API_KEY` environment variable.
+        api_version (`str`, *optional*):
+            The API version to use. If not provided, it will be inferred from the `OPENAI_API_VERSION` environment variable.
+        client_kwargs (`dict[str, Any]`, *optional*):
+            Additional keyword arguments to pass to the AzureOpenAI client (like organization, project, max_retries etc.).
+        custom_role_conversions (`dict[str, str]`, *optional*):
+            Custom role conversion mapping to convert message roles in others.
+            Useful for specific models that do not support specific message roles like "system".
+        **kwargs:
+            Additional keyword arguments to pass to the Azure OpenAI API.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        model_id: str,
+        azure_endpoint: Optional[str] = None,
+        azure_deployment: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_version: Optional[str] = None,
+        client_kwargs: Optional[Dict[str, Any]] = None,
+        custom_role_conversions: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ):
+        if openai is None:
+            raise ModuleNotFoundError(
+                "Please install 'openai' extra to use AzureOpenAIServerModel: `pip install 'smolagents[openai]'`"
+            )
+        client_kwargs = client_kwargs or {}
+        client_kwargs.update(
+            {
+                "api_version": api_version,
+                "azure_endpoint": azure_endpoint,
+                "azure_deployment": azure_deployment,
+            }
+        )
+        super().__init__(
+            model_id=model_id,
+            api_key=api_key,
+            client_kwargs=client_kwargs,
+            custom_role_conversions=custom_role_conversions,
+            **kwargs,
+        )
+
+    def create_client(self):
+        return _get_cached_client(
+            openai.AzureOpenAI, _with_shared_http_client(self.client_kwargs)
+        )
+
+
+__all__ = [
+    "MessageRole",
+    "tool_role_conversions",
+    "get_clean_message_list",
+    "Model",
+    "MLXModel",
+    "TransformersModel",
+    "HfApiModel",
+    "LiteLLMModel",
+    "OpenAIServerModel",
+    "VLLMModel",
+    "AzureOpenAIServerModel",
+    "ChatMessage",
+]
@@ -1,14 +1,18 @@
 #!/usr/bin/env python
 # coding=utf-8
+import copy
 import importlib
+import importlib.util
 import inspect
 import json
 import os
 import re
 import tempfile
 import textwrap
+import threading
 import time
-from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from logging import getLogger
 from pathlib import Path
 from typing import (
@@ -26,6 +30,12 @@ from typing import (
 
 import jinja2
 import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from huggingface_hub import (
     create_repo,
     metadata_update,
@@ -72,16 +82,63 @@ from tools.utils import (
 
 logger = getLogger(__name__)
 
+# Matches a fenced ```json ... ``` block in one compiled-regex pass instead
+# of two str.find traversals over the model output.
+_JSON_BLOCK_RE = re.compile(r"```json\s*(.*?)```", re.DOTALL)
+
+# Sentinel distinguishing "key absent" from stored falsy/None state values.
+_MISSING = object()
+
+
+@lru_cache(maxsize=256)
+def _loads_tool_call_blob(json_str: str):
+    """Parse a fenced tool-call blob, memoizing recent results.
+
+    Model retries and replays frequently resend identical blobs; a cache hit
+    skips the parse entirely. Callers must treat the returned object as
+    read-only since it is shared across hits.
+    """
+    if orjson is not None:
+        # orjson's C parser raises a json.JSONDecodeError subclass, so the
+        # error handling upstream is unchanged.
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def _parse_tool_call_json(tool_json) -> Optional[Tuple[str, Any]]:
+    """Specialized shape check for `{"name": ..., "arguments": ...}` blobs.
+
+    Runs on every assistant response that is not a native tool call, so it
+    avoids generic validation machinery: one type check and two dict lookups.
+    Returns `(name, arguments)` or `None` if the shape does not match.
+    """
+    if type(tool_json) is not dict:
+        return None
+    name = tool_json.get("name")
+    if name is None:
+        return None
+    return name, tool_json.get("arguments")
+
 
 def get_variable_names(self, template: str) -> Set[str]:
     pattern = re.compile(r"\{\{([^{}]+)\}\}")
     return {match.group(1).strip() for match in pattern.finditer(template)}
 
 
+@lru_cache(maxsize=256)
+def _compile_template(template: str) -> Template:
+    """Compile a Jinja template once per distinct template string.
+
+    The same prompt templates (system prompt, planning, final answer) are
+    rendered on every step, so caching the compiled Template skips Jinja's
+    parse/AST build on all renders after the first.
+    """
+    return Template(template, undefined=StrictUndefined)
+
+
 def populate_template(template: str, variables: Dict[str, Any]) -> str:
-    compiled_template = Template(template, undefined=StrictUndefined)
     try:
-        return compiled_template.render(**variables)
+        return _compile_template(template).render(**variables)
     except Exception as e:
         raise Exception(
             f"Error during jinja template rendering: {type(e).__name__}: {e}"
@@ -188,6 +245,8 @@ class MultiStepAgent:
         description (`str`, *optional*): Necessary for a managed agent only - the description of this agent.
         provide_run_summary (`bool`, *optional*): Whether to provide a run summary when called as a managed agent.
         final_answer_checks (`list`, *optional*): List of Callables to run before returning a final answer for checking validity.
+        memory_window (`int`, *optional*): If set, only the last `memory_window` steps are sent to the LLM in full;
+            older steps are compressed into a short textual brief state, keeping the prompt size bounded on long runs.
     """
 
     def __init__(
@@ -208,10 +267,19 @@ class MultiStepAgent:
         provide_run_summary: bool = False,
         final_answer_checks: Optional[List[Callable]] = None,
         log_file: Optional[str] = None,
+        memory_window: Optional[int] = None,
     ):
         self.agent_name = self.__class__.__name__
         self.tools = tools
         self.tools_path = tools_path
+        # Tools module and resolved functions, loaded lazily on first call
+        # and reused for the rest of the run (see execute_tool_call). The
+        # path is resolved once here to keep getcwd syscalls off that path.
+        self._tools_file = Path(tools_path).absolute()
+        self._tools_module = None
+        self._tools_mtime = None
+        self._tools_module_lock = threading.Lock()
+        self._tool_fn_cache: Dict[str, Callable] = {}
         self.model = model
         self.prompt_templates = prompt_templates or EMPTY_PROMPT_TEMPLATES
         self.max_steps = max_steps
@@ -219,10 +287,14 @@ class MultiStepAgent:
         self.grammar = grammar
         self.planning_interval = planning_interval
         self.state = {}
+        self._snapshots: Dict[int, Any] = {}
         self.name = name
         self.description = description
         self.provide_run_summary = provide_run_summary
         self.final_answer_checks = final_answer_checks
+        self.memory_window = memory_window
+        # Brief-state lines compiled so far: (steps covered, lines).
+        self._brief_state = (0, [])
 
         self._setup_managed_agents(managed_agents)
         self._validate_tools_and_managed_agents(tools, managed_agents)
@@ -235,6 +307,9 @@ class MultiStepAgent:
         self.monitor = Monitor(self.model, self.logger)
         self.step_callbacks = step_callbacks if step_callbacks is not None else []
         self.step_callbacks.append(self.monitor.update_metrics)
+        # Callback arities, resolved lazily: inspect.signature is far too
+        # slow to re-run on every step (see _call_step_callbacks).
+        self._callback_arity: Dict[int, int] = {}
 
     def _setup_managed_agents(self, managed_agents):
         self.managed_agents = {}
@@ -329,17 +404,22 @@ You have been provided with these additional arguments, that you can access usin
             # The steps are returned as they are executed through a generator to iterate on.
             return self._run(task=self.task, max_steps=max_steps, images=images)
         # Outputs are returned only at the end. We only look at the last step.
-        return deque(
-            self._run(task=self.task, max_steps=max_steps, images=images), maxlen=1
-        )[0]
+        output = None
+        for output in self._run(task=self.task, max_steps=max_steps, images=images):
+            pass
+        return output
 
     def _run(
         self, task: str, max_steps: int, images: Optional[List[str]] = None
     ) -> Generator[ActionStep, None, None]:
         final_answer = None
-        self.step_number = 1
-        while final_answer is None and self.step_number <= max_steps:
-            step_start_time = time.time()
+        # Local bindings for names read on every iteration of the loop.
+        _time, _perf = time.time, time.perf_counter
+        step_number = 1
+        self.step_number = step_number
+        while final_answer is None and step_number <= max_steps:
+            step_start_time = _time()
+            step_start_perf = _perf()
             memory_step = self._create_memory_step(step_start_time, images)
             try:
                 final_answer = self._execute_step(task, memory_step)
@@ -350,12 +430,13 @@ You have been provided with these additional arguments, that you can access usin
                 # Other AgentError types are caused by the Model, so we should log them and iterate.
                 memory_step.error = e
             finally:
-                self._finalize_step(memory_step, step_start_time)
+                self._finalize_step(memory_step, step_start_perf)
                 yield memory_step
-                self.step_number += 1
+                step_number += 1
+                self.step_number = step_number
 
-        if final_answer is None and self.step_number == max_steps + 1:
-            final_answer = self._handle_max_steps_reached(task, images, step_start_time)
+        if final_answer is None and step_number == max_steps + 1:
+            final_answer = self._handle_max_steps_reached(task, images, step_start_perf)
             yield memory_step
         yield handle_agent_output_types(final_answer)
 
@@ -392,18 +473,25 @@ You have been provided with these additional arguments, that you can access usin
                     self.logger,
                 )
 
-    def _finalize_step(self, memory_step: ActionStep, step_start_time: float):
+    def _finalize_step(self, memory_step: ActionStep, step_start_perf: float):
         memory_step.end_time = time.time()
-        memory_step.duration = memory_step.end_time - step_start_time
+        # Durations come from perf_counter so they stay correct across
+        # wall-clock adjustments; start_time/end_time remain wall-clock.
+        memory_step.duration = time.perf_counter() - step_start_perf
         self.memory.steps.append(memory_step)
+        self._call_step_callbacks(memory_step)
+
+    def _call_step_callbacks(self, memory_step: ActionStep) -> None:
         for callback in self.step_callbacks:
+            arity = self._callback_arity.get(id(callback))
+            if arity is None:
+                arity = len(inspect.signature(callback).parameters)
+                self._callback_arity[id(callback)] = arity
             # For compatibility with old callbacks that don't take the agent as an argument
-            callback(memory_step) if len(
-                inspect.signature(callback).parameters
-            ) == 1 else callback(memory_step, agent=self)
+            callback(memory_step) if arity == 1 else callback(memory_step, agent=self)
 
     def _handle_max_steps_reached(
-        self, task: str, images: List[str], step_start_time: float
+        self, task: str, images: List[str], step_start_perf: float
     ) -> Any:
         final_answer = self.provide_final_answer(task, images)
         final_memory_step = ActionStep(
@@ -412,12 +500,9 @@ You have been provided with these additional arguments, that you can access usin
         )
         final_memory_step.action_output = final_answer
         final_memory_step.end_time = time.time()
-        final_memory_step.duration = final_memory_step.end_time - step_start_time
+        final_memory_step.duration = time.perf_counter() - step_start_perf
         self.memory.steps.append(final_memory_step)
-        for callback in self.step_callbacks:
-            callback(final_memory_step) if len(
-                inspect.signature(callback).parameters
-            ) == 1 else callback(final_memory_step, agent=self)
+        self._call_step_callbacks(final_memory_step)
         return final_answer
 
     def planning_step(self, task, is_first_step: bool, step: int) -> None:
@@ -471,7 +556,7 @@ You have been provided with these additional arguments, that you can access usin
     ) -> Tuple[ChatMessage, ChatMessage]:
         # Do not take the system prompt message from the memory
         # summary_mode=False: Do not take previous plan steps to avoid influencing the new plan
-        memory_messages = self.write_memory_to_messages()[1:]
+        memory_messages = self.write_memory_to_messages(include_system=False)
         facts_update_pre = {
             "role": MessageRole.SYSTEM,
             "content": [
@@ -564,11 +649,12 @@ You have been provided with these additional arguments, that you can access usin
                 model_output_message_facts=facts_message,
             )
         )
-        self.logger.log(
-            Rule(f"[bold]{log_message}", style="orange"),
-            Text(plan),
-            level=LogLevel.INFO,
-        )
+        if self.logger.level >= LogLevel.INFO:
+            self.logger.log(
+                Rule(f"[bold]{log_message}", style="orange"),
+                Text(plan),
+                level=LogLevel.INFO,
+            )
 
     @property
     def logs(self):
@@ -584,17 +670,126 @@ You have been provided with these additional arguments, that you can access usin
     def write_memory_to_messages(
         self,
         summary_mode: Optional[bool] = False,
+        include_system: bool = True,
     ) -> List[Dict[str, str]]:
         """
         Reads past llm_outputs, actions, and observations or errors from the memory into a series of messages
         that can be used as input to the LLM. Adds a number of keywords (such as PLAN, error, etc) to help
         the LLM.
+
+        Past steps are serialized once and cached on the memory, so each call
+        only serializes steps appended since the previous one; the returned
+        list is built fresh per call and safe for callers to extend.
+        """
+        summary_mode = bool(summary_mode)
+        steps = self.memory.steps
+        if self.memory_window is not None and len(steps) > self.memory_window:
+            return self._write_windowed_messages(
+                steps, summary_mode=summary_mode, include_system=include_system
+            )
+        cached_messages, cached_count = self.memory._messages_cache[summary_mode]
+        if cached_count > len(steps):
+            # Steps were truncated or replaced (e.g. by restore()): rebuild.
+            cached_messages, cached_count = [], 0
+        for memory_step in steps[cached_count:]:
+            cached_messages.extend(memory_step.to_messages(summary_mode=summary_mode))
+        self.memory._messages_cache[summary_mode] = (cached_messages, len(steps))
+        if not include_system:
+            return list(cached_messages)
+        return (
+            self.memory.system_prompt.to_messages(summary_mode=summary_mode)
+            + cached_messages
+        )
+
+    def _write_windowed_messages(
+        self, steps: List, summary_mode: bool, include_system: bool
+    ) -> List[Dict[str, str]]:
+        """Bounded-context variant of `write_memory_to_messages`.
+
+        Steps older than `self.memory_window` are collapsed into a compact
+        brief-state message; only the trailing window is serialized in full,
+        so the prompt grows with the window instead of the whole trajectory.
         """
-        messages = self.memory.system_prompt.to_messages(summary_mode=summary_mode)
-        for memory_step in self.memory.steps:
+        older_steps = steps[: -self.memory_window]
+        messages = (
+            self.memory.system_prompt.to_messages(summary_mode=summary_mode)
+            if include_system
+            else []
+        )
+        messages.append(
+            {
+                "role": MessageRole.SYSTEM,
+                "content": [
+                    {"type": "text", "text": self._compile_brief_state(older_steps)}
+                ],
+            }
+        )
+        for memory_step in steps[-self.memory_window :]:
             messages.extend(memory_step.to_messages(summary_mode=summary_mode))
         return messages
 
+    def _compile_brief_state(self, older_steps: List) -> str:
+        """Compress already-summarized steps into a few lines of text.
+
+        Lines are built incrementally: each call only summarizes steps that
+        fell out of the window since the previous one. Planning steps are
+        skipped since later actions supersede them.
+        """
+        cached_count, lines = self._brief_state
+        if cached_count > len(older_steps):
+            cached_count, lines = 0, []
+        for memory_step in older_steps[cached_count:]:
+            if isinstance(memory_step, TaskStep):
+                lines.append(f"- task: {memory_step.task}")
+            elif isinstance(memory_step, ActionStep):
+                for tool_call in memory_step.tool_calls or ():
+                    lines.append(
+                        f"- step {memory_step.step_number}: called {tool_call.name} with {tool_call.arguments}"
+                    )
+                if memory_step.error is not None:
+                    lines.append(f"  error: {memory_step.error}")
+                elif memory_step.observations:
+                    observation = memory_step.observations
+                    if len(observation) > 200:
+                        observation = observation[:200] + " (...)"
+                    lines.append(f"  result: {observation}")
+        self._brief_state = (len(older_steps), lines)
+        return (
+            "Summary of earlier steps (compressed; the most recent steps follow in full):\n"
+            + "\n".join(lines)
+        )
+
+    def snapshot(self) -> int:
+        """Save a copy of the agent's trajectory, keyed by the current step.
+
+        Together with [`restore`], this lets callers branch from an earlier
+        point of a run instead of replaying every step from scratch. Because
+        a restored run replays the exact same message prefix, an inference
+        server's prefix KV cache stays warm across branches.
+
+        Returns:
+            `int`: Snapshot id to pass to [`restore`].
+        """
+        snapshot_id = self.step_number
+        self._snapshots[snapshot_id] = copy.deepcopy(
+            (self.state, self.memory.steps, self.step_number)
+        )
+        return snapshot_id
+
+    def restore(self, snapshot_id: int) -> None:
+        """Reset the agent's state and memory to a previously saved snapshot.
+
+        Args:
+            snapshot_id (`int`): Id returned by a previous [`snapshot`] call.
+        """
+        if snapshot_id not in self._snapshots:
+            raise ValueError(f"Unknown snapshot id: {snapshot_id}")
+        state, steps, step_number = copy.deepcopy(self._snapshots[snapshot_id])
+        self.state = state
+        self.memory.steps = steps
+        self.memory._clear_messages_cache()
+        self.step_number = step_number
+
     def visualize(self):
         """Creates a rich tree visualization of the agent's structure."""
         self.logger.visualize_agent_tree(self)
@@ -620,22 +815,33 @@ You have been provided with these additional arguments, that you can access usin
             )
         return rationale.strip(), action.strip()
 
-    def provide_final_answer(self, task: str, images: Optional[list[str]]) -> str:
+    def provide_final_answer(
+        self, task: str, images: Optional[list[str]], stream: bool = False
+    ) -> Union[str, Generator[str, None, None]]:
         """
         Provide the final answer to the task, based on the logs of the agent's interactions.
 
         Args:
             task (`str`): Task to perform.
             images (`list[str]`, *optional*): Paths to image(s).
+            stream (`bool`, defaults to `False`): If True and the model exposes
+                a `stream_text` method, return a generator yielding the answer
+                text incrementally instead of blocking until the full
+                completion is available.
 
         Returns:
-            `str`: Final answer to the task.
+            `str` or `Generator[str, None, None]`: Final answer to the task.
         """
-        messages = []
+        messages = self.write_memory_to_messages(include_system=False)
         if images:
-            messages[0]["content"].append({"type": "image"})
-        messages += self.write_memory_to_messages()[1:]
-        messages += [
+            messages.insert(
+                0,
+                {
+                    "role": MessageRole.USER,
+                    "content": [{"type": "image", "image": image} for image in images],
+                },
+            )
+        messages.append(
             {
                 "role": MessageRole.USER,
                 "content": [
@@ -648,13 +854,26 @@ You have been provided with these additional arguments, that you can access usin
                     }
                 ],
             }
-        ]
+        )
+        if stream and hasattr(self.model, "stream_text"):
+            return self._stream_final_answer(messages)
         try:
             chat_message: ChatMessage = self.model(messages)
             return chat_message.content
         except Exception as e:
             return f"Error in generating final LLM output:\n{e}"
 
+    def _stream_final_answer(self, messages: List[Dict[str, str]]) -> Generator[str, None, None]:
+        """Yield the final answer's tokens as the model produces them.
+
+        Errors surface as a final yielded chunk so callers consuming the
+        stream see the same message a blocking call would have returned.
+        """
+        try:
+            yield from self.model.stream_text(messages)
+        except Exception as e:
+            yield f"Error in generating final LLM output:\n{e}"
+
     def execute_tool_call(
         self, tool_name: str, arguments: Union[Dict[str, str], str]
     ) -> Any:
@@ -666,19 +885,39 @@ You have been provided with these additional arguments, that you can access usin
             tool_name (`str`): Name of the Tool to execute (should be one from self.tools).
             arguments (Dict[str, str]): Arguments passed to the Tool.
         """
-        import importlib.util
-        from pathlib import Path
-        
-        file_path = Path(self.tools_path).absolute()
-        module_name = file_path.stem
-        spec = importlib.util.spec_from_file_location(module_name, file_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        
-        func = getattr(module, tool_name)
-        result = func(**arguments)
-            
-        return result
+        if (
+            self._tools_module is None
+            or os.stat(self._tools_file).st_mtime != self._tools_mtime
+        ):
+            self._load_tools_module()
+        func = self._tool_fn_cache.get(tool_name)
+        if func is None:
+            func = getattr(self._tools_module, tool_name)
+            self._tool_fn_cache[tool_name] = func
+        return func(**arguments)
+
+    def _load_tools_module(self):
+        """(Re)load the module at `self.tools_path` and cache it.
+
+        Previously every tool invocation re-parsed and re-executed the whole
+        tools file; now that happens once per file version - the cache is
+        keyed on the file's mtime, so editing the tools file on disk is
+        picked up on the next call. Concurrent tool calls are serialized
+        through the lock so exec_module never races.
+        """
+        with self._tools_module_lock:
+            mtime = os.stat(self._tools_file).st_mtime
+            if self._tools_module is None or mtime != self._tools_mtime:
+                file_path = self._tools_file
+                spec = importlib.util.spec_from_file_location(
+                    file_path.stem, file_path
+                )
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self._tools_module = module
+                self._tools_mtime = mtime
+                self._tool_fn_cache.clear()
+        return self._tools_module
 
 
     def step(self, memory_step: ActionStep) -> Union[None, Any]:
@@ -708,11 +947,16 @@ You have been provided with these additional arguments, that you can access usin
             variables=dict(name=self.name, final_answer=report),
         )
         if self.provide_run_summary:
-            answer += "\n\nFor more detail, find below a summary of this agent's work:\n<summary_of_work>\n"
-            for message in self.write_memory_to_messages(summary_mode=True):
-                content = message["content"]
-                answer += "\n" + truncate_content(str(content)) + "\n---"
-            answer += "\n</summary_of_work>"
+            # Single join instead of quadratic += concatenation over the summary
+            summary_parts = [
+                "\n\nFor more detail, find below a summary of this agent's work:\n<summary_of_work>\n"
+            ]
+            summary_parts.extend(
+                "\n" + truncate_content(str(message["content"])) + "\n---"
+                for message in self.write_memory_to_messages(summary_mode=True)
+            )
+            summary_parts.append("\n</summary_of_work>")
+            answer += "".join(summary_parts)
         return answer
 
     def save(self, output_dir: str, relative_path: Optional[str] = None):
@@ -1095,6 +1339,12 @@ class ToolCallingAgent(MultiStepAgent):
         self.tool_call = []
         self.communicator = communicator
         self.robot_name = robot_name
+        # Pool for dispatching parallel tool calls; worker threads are only
+        # spawned on first submit, so unused pools cost nothing.
+        self._tool_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("TOOL_CONCURRENCY_LIMIT", "8")),
+            thread_name_prefix="tool",
+        )
         super().__init__(
             tools=tools,
             tools_path=tools_path,
@@ -1105,42 +1355,133 @@ class ToolCallingAgent(MultiStepAgent):
         )
         
     def initialize_system_prompt(self) -> str:
-        
+        # The render is deterministic for a given template and tool set, and
+        # run() re-invokes this on every call, so memoize it per instance.
+        # id()-based keys are stable because self keeps all three referents
+        # alive; len() additionally catches tools appended in place.
+        cache_key = (
+            id(self.prompt_templates["system_prompt"]),
+            id(self.tools),
+            len(self.tools),
+            id(self.managed_agents),
+        )
+        cached = getattr(self, "_system_prompt_cache", None)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
         system_prompt = populate_template(
             self.prompt_templates["system_prompt"],
             variables={"tools": self.tools, "managed_agents": self.managed_agents},
         )
+        self._system_prompt_cache = (cache_key, system_prompt)
         return system_prompt
 
     def _extract_json(self, input_string):
         """Extract JSON from a string."""
-        start_marker = "```json"
-        end_marker = "```"
+        match = _JSON_BLOCK_RE.search(input_string)
+        if match is None:
+            self.logger.log("[WARNING] JSON markers not found in the string.")
+            return None
         try:
-            start_idx = input_string.find(start_marker)
-            end_idx = input_string.find(end_marker, start_idx + len(start_marker))
-            if start_idx == -1 or end_idx == -1:
-                self.logger.log("[WARNING] JSON markers not found in the string.")
-                return None
-            json_str = input_string[start_idx + len(start_marker) : end_idx].strip()
-            return json.loads(json_str)
+            return _loads_tool_call_blob(match.group(1).strip())
         except json.JSONDecodeError as e:
             self.logger.log(
                 f"[WARNING] JSON cannot be extracted from the string.\n{e}"
             )
             return None
 
+    def _tool_scheduling_metadata(self) -> Dict[str, Tuple[tuple, int]]:
+        """Map tool name -> (depends_on, priority) from the tool specs.
+
+        Tool dicts may carry optional `depends_on` (list of tool names) and
+        `priority` (int, higher runs first) keys next to their "function"
+        entry. The map is memoized per tools list, like the system prompt.
+        """
+        cache_key = (id(self.tools), len(self.tools))
+        cached = getattr(self, "_tool_metadata_cache", None)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+        metadata = {}
+        for tool in self.tools:
+            if isinstance(tool, dict):
+                name = tool.get("function", {}).get("name")
+                if name:
+                    metadata[name] = (
+                        tuple(tool.get("depends_on") or ()),
+                        int(tool.get("priority") or 0),
+                    )
+        self._tool_metadata_cache = (cache_key, metadata)
+        return metadata
+
+    def _dispatch_tool_calls(self, requested_calls: List[Tuple]) -> List[Any]:
+        """Run a batch of tool calls on the pool, honoring declared ordering.
+
+        Calls execute in topological waves: a call waits until every
+        batch-mate named in its tool's `depends_on` has finished, while
+        independent calls fan out together, submitted highest `priority`
+        first. Results come back in positional order, with per-call failures
+        wrapped in AgentExecutionError so one error does not kill the batch.
+        """
+        metadata = self._tool_scheduling_metadata()
+        names = [call[0] for call in requested_calls]
+        batch_names = set(names)
+        dependencies = [
+            {
+                dependency
+                for dependency in metadata.get(name, ((), 0))[0]
+                if dependency in batch_names and dependency != name
+            }
+            for name in names
+        ]
+        observations: List[Any] = [None] * len(requested_calls)
+        remaining = set(range(len(requested_calls)))
+        completed_names: set = set()
+        while remaining:
+            ready = [
+                index
+                for index in remaining
+                if dependencies[index] <= completed_names
+            ]
+            if not ready:
+                # Dependency cycle (or dep that keeps failing to register):
+                # run whatever is left rather than deadlocking the step.
+                ready = list(remaining)
+            ready.sort(key=lambda index: -metadata.get(names[index], ((), 0))[1])
+            futures = {
+                index: self._tool_pool.submit(
+                    self.execute_tool_call,
+                    names[index],
+                    requested_calls[index][1] or {},
+                )
+                for index in ready
+            }
+            for index in ready:
+                try:
+                    observations[index] = futures[index].result()
+                except Exception as e:
+                    observations[index] = AgentExecutionError(
+                        f"Error executing tool '{names[index]}': {e}", self.logger
+                    )
+                completed_names.add(names[index])
+                remaining.discard(index)
+        return observations
+
     def step(self, memory_step: ActionStep) -> Union[None, Any]:
         """
         Perform one step in the ReAct framework: the agent thinks, acts, and observes the result.
         Returns None if the step is not final.
         """
+        # Pre-bind attributes that this hot path touches repeatedly. Rich
+        # Panel/Text objects are only built when INFO logging is enabled;
+        # their layout and formatting work is wasted on filtered lines.
+        logger = self.logger
+        verbose_info = logger.level >= LogLevel.INFO
         memory_messages = self.write_memory_to_messages()
 
         self.input_messages = memory_messages
 
-        # Add new step in logs
-        memory_step.model_input_messages = memory_messages.copy()
+        # Add new step in logs. write_memory_to_messages returns a fresh list
+        # each call, so it can be stored directly without a defensive copy.
+        memory_step.model_input_messages = memory_messages
 
         try:
             model_message: ChatMessage = self.model(
@@ -1151,45 +1492,63 @@ class ToolCallingAgent(MultiStepAgent):
             memory_step.model_output_message = model_message
         except Exception as e:
             raise AgentGenerationError(
-                f"Error in generating tool call with model:\n{e}", self.logger
+                f"Error in generating tool call with model:\n{e}", logger
             ) from e
 
-        self.logger.log_markdown(
-            content=model_message.content
-            if model_message.content
-            else str(model_message.raw),
-            title="Output message of the LLM:",
-            level=LogLevel.DEBUG,
-        )
+        # Only fall back to repr-ing the raw API response when DEBUG is on:
+        # stringifying the full response object serializes every choice and
+        # usage field and is wasteful if the log line is filtered anyway.
+        model_output = model_message.content
+        if model_output or logger.level >= LogLevel.DEBUG:
+            logger.log_markdown(
+                content=model_output if model_output else str(model_message.raw),
+                title="Output message of the LLM:",
+                level=LogLevel.DEBUG,
+            )
         if model_message.tool_calls:
-            tool_call = model_message.tool_calls[0]
-            tool_name, tool_call_id = tool_call.function.name, tool_call.id
-            tool_arguments = tool_call.function.arguments
+            requested_calls = [
+                (tool_call.function.name, tool_call.function.arguments, tool_call.id)
+                for tool_call in model_message.tool_calls
+            ]
         else:
-            final_answer = model_message.content
-            self.logger.log(
-                Text(f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"),
-                level=LogLevel.INFO,
-            )
-            tool_json = self._extract_json(final_answer)
+            final_answer = model_output
+            if verbose_info:
+                logger.log(
+                    Text(f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"),
+                    level=LogLevel.INFO,
+                )
+            parsed_call = self._extract_json(final_answer)
+            tool_json = _parse_tool_call_json(parsed_call) if parsed_call else None
             if tool_json:
-                tool_name, tool_arguments = tool_json["name"], tool_json["arguments"]
-                tool_call_id = model_message.raw.id 
+                tool_name, tool_arguments = tool_json
+                requested_calls = [(tool_name, tool_arguments, model_message.raw.id)]
             else:
                 memory_step.action_output = final_answer
                 return final_answer
 
+        # A final_answer ends the run, so any sibling calls the model emitted
+        # alongside it are dropped.
+        for requested_call in requested_calls:
+            if requested_call[0] == "final_answer":
+                requested_calls = [requested_call]
+                break
+
         memory_step.tool_calls = [
-            ToolCall(name=tool_name, arguments=tool_arguments, id=tool_call_id)
+            ToolCall(name=name, arguments=arguments, id=call_id)
+            for name, arguments, call_id in requested_calls
         ]
 
+        tool_name, tool_arguments, tool_call_id = requested_calls[0]
         # Execute
-        self.logger.log(
-            Panel(
-                Text(f"Calling tool: '{tool_name}' with arguments: {tool_arguments}")
-            ),
-            level=LogLevel.INFO,
-        )
+        if verbose_info:
+            logger.log(
+                Panel(
+                    Text(
+                        f"Calling tool: '{tool_name}' with arguments: {tool_arguments}"
+                    )
+                ),
+                level=LogLevel.INFO,
+            )
         if tool_name == "final_answer":
             if isinstance(tool_arguments, dict):
                 if "answer" in tool_arguments:
@@ -1198,43 +1557,73 @@ class ToolCallingAgent(MultiStepAgent):
                     answer = tool_arguments
             else:
                 answer = tool_arguments
-            if (
-                isinstance(answer, str) and answer in self.state.keys()
-            ):  # if the answer is a state variable, return the value
-                final_answer = self.state[answer]
-                self.logger.log(
+            # If the answer is a state variable, return its value; a single
+            # get with a sentinel replaces the key-view membership test plus
+            # second lookup.
+            final_answer = (
+                self.state.get(answer, _MISSING)
+                if isinstance(answer, str)
+                else _MISSING
+            )
+            if final_answer is not _MISSING:
+                logger.log(
                     f"[bold {YELLOW_HEX}]Final answer:[/bold {YELLOW_HEX}] Extracting key '{answer}' from state to return value '{final_answer}'.",
                     level=LogLevel.INFO,
                 )
             else:
                 final_answer = answer
-                self.logger.log(
-                    Text(f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"),
-                    level=LogLevel.INFO,
-                )
+                if verbose_info:
+                    logger.log(
+                        Text(
+                            f"Final answer: {final_answer}", style=f"bold {YELLOW_HEX}"
+                        ),
+                        level=LogLevel.INFO,
+                    )
 
             memory_step.action_output = final_answer
             return final_answer
         else:
-            if tool_arguments is None:
-                tool_arguments = {}
-            observation = self.execute_tool_call(tool_name, tool_arguments)
-            observation_type = type(observation)
-            if observation_type in [AgentImage, AgentAudio]:
-                if observation_type == AgentImage:
-                    observation_name = "image.png"
-                elif observation_type == AgentAudio:
-                    observation_name = "audio.mp3"
-                # TODO: observation naming could allow for different names of same type
-
-                self.state[observation_name] = observation
-                updated_information = f"Stored '{observation_name}' in memory."
+            if len(requested_calls) > 1:
+                # Independent calls fan out across the pool: wall-clock drops
+                # from the sum of tool latencies to the slowest one. Failures
+                # are wrapped per call so one error does not kill the batch.
+                if verbose_info:
+                    for name, arguments, _ in requested_calls[1:]:
+                        logger.log(
+                            Panel(
+                                Text(
+                                    f"Calling tool: '{name}' with arguments: {arguments}"
+                                )
+                            ),
+                            level=LogLevel.INFO,
+                        )
+                observations = self._dispatch_tool_calls(requested_calls)
             else:
-                updated_information = str(observation).strip()
-            self.tool_call.append({"tool_name": tool_name, "result": observation})
-            self.logger.log(
-                f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
-                level=LogLevel.INFO,
-            )
-            memory_step.observations = updated_information
+                if tool_arguments is None:
+                    tool_arguments = {}
+                observations = [self.execute_tool_call(tool_name, tool_arguments)]
+
+            # Observations are merged back in positional order so the memory
+            # stays aligned with memory_step.tool_calls.
+            observation_texts = []
+            for (name, _, _), observation in zip(requested_calls, observations):
+                observation_type = type(observation)
+                if observation_type in [AgentImage, AgentAudio]:
+                    if observation_type == AgentImage:
+                        observation_name = "image.png"
+                    elif observation_type == AgentAudio:
+                        observation_name = "audio.mp3"
+                    # TODO: observation naming could allow for different names of same type
+
+                    self.state[observation_name] = observation
+                    updated_information = f"Stored '{observation_name}' in memory."
+                else:
+                    updated_information = str(observation).strip()
+                self.tool_call.append({"tool_name": name, "result": observation})
+                logger.log(
+                    f"Observations: {updated_information.replace('[', '|')}",  # escape potential rich-tag-like components
+                    level=LogLevel.INFO,
+                )
+                observation_texts.append(updated_information)
+            memory_step.observations = "\n".join(observation_texts)
             return None
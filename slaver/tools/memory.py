@@ -14,7 +14,7 @@
 # limitations under the License.
 from dataclasses import asdict, dataclass
 from logging import getLogger
-from typing import TYPE_CHECKING, Any, Dict, List, TypedDict, Union, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, TypedDict, Union, Optional
 
 from agents.models import ChatMessage, MessageRole
 from tools.monitoring import AgentLogger, LogLevel
@@ -34,8 +34,9 @@ class Message(TypedDict):
     content: Union[str, List[Dict]]
 
 
-@dataclass
-class ToolCall:
+class ToolCall(NamedTuple):
+    # Read-only value object: tuple storage is cheaper to construct and hold
+    # than a dataclass with a per-instance __dict__.
     name: str
     arguments: Any
     id: str
@@ -51,7 +52,7 @@ class ToolCall:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class MemoryStep:
     def dict(self):
         return asdict(self)
@@ -60,7 +61,10 @@ class MemoryStep:
         raise NotImplementedError
 
 
-@dataclass
+# slots=True: one ActionStep is allocated per step and its attributes are
+# read throughout logging and serialization, so dropping the per-instance
+# __dict__ saves memory and speeds attribute access on long trajectories.
+@dataclass(slots=True)
 class ActionStep(MemoryStep):
     model_input_messages: Optional[List[Message]] = None
     tool_calls: Optional[List[ToolCall]] = None
@@ -236,9 +240,18 @@ class AgentMemory:
     def __init__(self, system_prompt: str):
         self.system_prompt = SystemPromptStep(system_prompt=system_prompt)
         self.steps: List[Union[TaskStep, ActionStep, PlanningStep]] = []
+        # Incrementally maintained serializations of `steps`, one per summary
+        # mode: (messages so far, number of steps covered). Steps are only
+        # appended during a run, so each write_memory_to_messages call just
+        # serializes the new tail instead of re-walking the whole history.
+        self._clear_messages_cache()
+
+    def _clear_messages_cache(self):
+        self._messages_cache = {False: ([], 0), True: ([], 0)}
 
     def reset(self):
         self.steps = []
+        self._clear_messages_cache()
 
     def get_succinct_steps(self) -> list[dict]:
         return [
@@ -26,6 +26,7 @@ import json
 import os
 import re
 import types
+import weakref
 from functools import lru_cache
 from io import BytesIO
 from textwrap import dedent
@@ -35,6 +36,13 @@ from typing import TYPE_CHECKING, Any, Dict, Tuple
 if TYPE_CHECKING:
     from memory import AgentLogger
 
+try:
+    # SIMD-accelerated base64 codec; image-heavy payloads encode several
+    # times faster than with the scalar stdlib implementation.
+    import pybase64 as _base64
+except ImportError:
+    _base64 = base64
+
 
 __all__ = ["AgentError"]
 
@@ -396,16 +404,89 @@ def get_source(obj) -> str:
         raise e from inspect_error
 
 
+# Agents often replay the same camera frame across several reasoning steps;
+# memoizing by object identity skips the PNG re-compression and base64 pass
+# entirely on a hit. Entries keep a weakref so a recycled id() can never
+# return a stale encoding.
+_MAX_CACHED_IMAGE_ENCODINGS = 256
+_image_encoding_cache: Dict[int, Tuple[Any, str]] = {}
+_image_data_url_cache: Dict[int, Tuple[Any, str]] = {}
+
+
 def encode_image_base64(image):
+    key = id(image)
+    cached = _image_encoding_cache.get(key)
+    if cached is not None and cached[0]() is image:
+        return cached[1]
     buffered = BytesIO()
     image.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    encoded = _base64.b64encode(buffered.getvalue()).decode("utf-8")
+    try:
+        image_ref = weakref.ref(image)
+    except TypeError:
+        return encoded
+    if len(_image_encoding_cache) >= _MAX_CACHED_IMAGE_ENCODINGS:
+        _image_encoding_cache.clear()
+    _image_encoding_cache[key] = (image_ref, encoded)
+    return encoded
 
 
 def make_image_url(base64_image):
     return f"data:image/png;base64,{base64_image}"
 
 
+def encode_image_data_url(image, mime="image/png"):
+    """Encode an image straight into a data URL in one buffer.
+
+    Fuses encode_image_base64 + make_image_url: the base64 payload is written
+    into the URL bytearray directly, avoiding a second O(N) string copy for
+    the concatenation. Results are memoized like encode_image_base64.
+    """
+    key = id(image)
+    cached = _image_data_url_cache.get(key)
+    if cached is not None and cached[0]() is image:
+        return cached[1]
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    buf = bytearray(b"data:")
+    buf += mime.encode("ascii")
+    buf += b";base64,"
+    buf += _base64.b64encode(buffered.getvalue())
+    data_url = buf.decode("ascii")
+    try:
+        image_ref = weakref.ref(image)
+    except TypeError:
+        return data_url
+    if len(_image_data_url_cache) >= _MAX_CACHED_IMAGE_ENCODINGS:
+        _image_data_url_cache.clear()
+    _image_data_url_cache[key] = (image_ref, data_url)
+    return data_url
+
+
+def pack_images(messages):
+    """Move raw image payloads out of the message structure.
+
+    Image content elements are left with an integer ``handle`` instead of the
+    payload, so the messages can be copied, logged or serialized cheaply; the
+    bytes live once in the returned store and are only touched when the clean
+    pass encodes them for the wire.
+
+    Returns:
+        `tuple`: The (mutated) message list and a `dict[int, Any]` image store.
+    """
+    image_store = {}
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for element in content:
+            if element.get("type") == "image" and "image" in element:
+                handle = len(image_store)
+                image_store[handle] = element.pop("image")
+                element["handle"] = handle
+    return messages, image_store
+
+
 def make_init_file(folder: str):
     os.makedirs(folder, exist_ok=True)
     # Create __init__